@@ -12,6 +12,12 @@ if %errorlevel%==1 (
     echo Requirements installed globally.
 )
 
+:: Optional: keeps Tesseract loaded instead of starting tesseract.exe for every name read
+pip install tesserocr
+if errorlevel 1 (
+    echo tesserocr could not be installed, name reads will start tesseract.exe through pytesseract.
+)
+
 :: Check for existing config
 if exist "CONFIG.ini" (
     echo Config file already exists, skipping creation.
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class ActionSignature:
+    """
+    Tells the gray (ready) and red (busy) action icons apart without template matching:
+    only the pixels where the two icons differ are sampled at the icon location, and their
+    colors are compared with both icons at once.
+    The pixels both icons share (outline, background) are sampled too and must match first:
+    the differing pixels alone are flat gray in the gray icon, so any gray patch would look ready.
+    """
+
+    def __init__(self, gray_template, red_template, min_difference=60, max_shared_difference=20,
+                 max_points=256, confidence=0.35):
+        self.templates = (gray_template, red_template)
+        self.size = gray_template.shape[1], gray_template.shape[0]
+
+        gray = gray_template.astype(np.float32)
+        red = red_template.astype(np.float32)
+        difference = np.linalg.norm(gray - red, axis=2)
+
+        self.ys, self.xs = self._spread(*np.nonzero(difference >= min_difference), max_points)
+        self.gray = gray[self.ys, self.xs]
+        self.red = red[self.ys, self.xs]
+
+        # Mean color distance between the two icons, the pixels must be much closer to one of them
+        self.separation = float(np.linalg.norm(self.gray - self.red, axis=1).mean()) if len(self.ys) else 0.0
+        self.max_distance = confidence * self.separation
+
+        self.shared_ys, self.shared_xs = self._spread(*np.nonzero(difference < max_shared_difference), max_points)
+        self.shared = (gray[self.shared_ys, self.shared_xs] + red[self.shared_ys, self.shared_xs]) / 2
+
+        # A uniform patch of the average shared color is this far from them, the icon must be much closer
+        spread = np.linalg.norm(self.shared - self.shared.mean(axis=0), axis=1).mean() if len(self.shared_ys) else 0.0
+        self.max_shared_distance = confidence * float(spread)
+
+    @staticmethod
+    def _spread(ys, xs, max_points):
+        """Evenly spread subset of the pixels, plenty to decide"""
+        if len(ys) > max_points:
+            keep = np.linspace(0, len(ys) - 1, max_points).astype(np.intp)
+            ys, xs = ys[keep], xs[keep]
+        return ys, xs
+
+    def classify(self, frame, location):
+        """
+        Readiness of the icon drawn at location (top left, screen coordinates)
+        Returns: True if ready (gray), False if busy (red), None when the pixels look like neither
+        """
+        if not len(self.ys) or not self.max_shared_distance:
+            return None
+        w, h = self.size
+        crop = frame.crop((location[0], location[1], w, h))
+        if crop.width < w or crop.height < h:
+            return None
+
+        # Not the icon (moved, covered, or just a patch of similar colors)
+        shared = crop.bgr[self.shared_ys, self.shared_xs].astype(np.float32)
+        if np.linalg.norm(shared - self.shared, axis=1).mean() > self.max_shared_distance:
+            return None
+
+        pixels = crop.bgr[self.ys, self.xs].astype(np.float32)
+        gray_distance = np.linalg.norm(pixels - self.gray, axis=1).mean()
+        red_distance = np.linalg.norm(pixels - self.red, axis=1).mean()
+
+        if min(gray_distance, red_distance) > self.max_distance:
+            return None  # Icon moved, covered or not drawn yet
+        return bool(gray_distance < red_distance)
@@ -1,3 +1,5 @@
+import sys
+import tkinter as tk
 from RegionCalibrator import RegionCalibrator
 from PokemonElementsOCR import PokemonElementsOCR
 from ConfigHandler import ConfigHandler
@@ -6,8 +8,8 @@ from ConfigHandler import ConfigHandler
 class CalibrationToolUI:
     def __init__(self, config_path="CONFIG.ini"):
         self.configHandler = ConfigHandler(config_path)
-        self.elementsOCR = PokemonElementsOCR.from_names_only(self.configHandler)
-        self.regionCalibrator = RegionCalibrator()
+        self.elementsOCR = PokemonElementsOCR.from_config_handler(self.configHandler)  # Needs the battle template
+        self.regionCalibrator = RegionCalibrator(self.elementsOCR.capture_backend)
         self.running = True
 
         self._setup_menu()
@@ -16,9 +18,12 @@ class CalibrationToolUI:
         """Define menu structure"""
         self.menu = {
             "header": self._create_header,
-            "1": {"label": "Change name region", "action": self.calibrate_name_position},
+            "1": {"label": "Change name region (during a battle to follow window moves)", "action": self.calibrate_name_position},
             "2": {"label": "Detect name", "action":
-                lambda: print(self.elementsOCR.detect_pokemon_name(self.configHandler.get("OCR", "name_region")) )},
+                lambda: print(self.elementsOCR.detect_pokemon_name(self._name_region()) )},
+            "3": {"label": "Teach name font", "action": self.teach_name_font},
+            "4": {"label": "Select game window (multi-client)", "action": self.calibrate_window},
+            "5": {"label": "Select battle message area (shiny check)", "action": self.calibrate_shiny_region},
             #"save": {"label": "Save", "action": self._save_config},
             "exit": {"label": "Exit", "action": self._exit_tool}
         }
@@ -91,18 +96,90 @@ class CalibrationToolUI:
                 print("Invalid selection!")
 
     def calibrate_name_position(self):
-        """Interactive visual calibration"""
+        """Interactive visual calibration, also recorded relative to the battle screen when in battle"""
+        # Before the selection overlay covers the screen
+        anchor = self.elementsOCR.find_battle_anchor()
+
+        region = self._select_region()
+        if region is None:
+            return  # Keep the current calibration
+
+        with self.configHandler.transaction():
+            self.configHandler.set("OCR", "name_region", str(region))
+            if anchor is not None:
+                offset = (region[0] - anchor[0], region[1] - anchor[1], region[2], region[3])
+                self.configHandler.set("OCR", "name_offset", str(offset))
+            else:
+                self.configHandler.set("OCR", "name_offset", "")  # An old offset would override the new region
+        print(f"\nCalibration successful! New detection Pokemon name region: {region}")
+        if anchor is not None:
+            print(f"Name region anchored to the battle screen (offset {offset}), it follows window moves")
+        else:
+            print("No battle on screen, calibrate during a battle to follow window moves")
+
+    def _name_region(self):
+        """Name region as the bot will use it: from the battle screen position when anchored"""
+        offset = self.configHandler.get("OCR", "name_offset")
+        if offset and self.elementsOCR.find_battle_anchor() is not None:
+            return self.elementsOCR.anchored_region(offset)
+        return self.configHandler.get("OCR", "name_region")
+
+
+    def _select_region(self):
+        """Region selected on the overlay, None when the selection was cancelled"""
         try:
             region = self.regionCalibrator.get_selection()
-            self.configHandler.set("OCR", "name_region", str(region))
-            print(f"\nCalibration successful! New detection Pokemon name region: {region}")
-        except: #TODO: Learn how to correctly implement exceptions
+        except (KeyboardInterrupt, tk.TclError):  # Ctrl+C, or the overlay window closed
+            region = None
+        if region is None:
             print("\nCalibration cancelled.")
+        return region
+
+    def calibrate_window(self):
+        """Select the window of this client when several clients share the screen"""
+        region = self._select_region()
+        if region is not None:
+            self.configHandler.set("Advanced", "window_region", str(region))
+            print(f"\nCalibration successful! New game window region: {region}")
+
+    def calibrate_shiny_region(self):
+        """Select where the battle message (and so the shiny message) is written, relative to the battle screen when in battle"""
+        # Before the selection overlay covers the screen
+        anchor = self.elementsOCR.find_battle_anchor()
+
+        region = self._select_region()
+        if region is None:
+            return
+
+        with self.configHandler.transaction():
+            if anchor is not None:
+                offset = (region[0] - anchor[0], region[1] - anchor[1], region[2], region[3])
+                self.configHandler.set("OCR", "shiny_offset", str(offset))
+                self.configHandler.set("OCR", "shiny_region", "")  # A fixed region would override the offset
+            else:
+                self.configHandler.set("OCR", "shiny_region", str(region))
+        print(f"\nCalibration successful! New battle message region: {region}")
+        if anchor is not None:
+            print(f"Message region anchored to the battle screen (offset {offset}), it follows window moves")
+        else:
+            print("No battle on screen, calibrate during a battle to follow window moves")
+
+    def teach_name_font(self):
+        """Label the name currently on screen so the glyph atlas can learn its characters"""
+        label = input("\nType the Pokémon name shown in battle: ").strip()
+        if not label:
+            return
+
+        if self.elementsOCR.learn_name_glyphs(self._name_region(), label):
+            print(f"Learned the glyphs of '{label}'")
+        else:
+            print("Could not split the name into the right number of characters, try another encounter.")
 
 
 # Usage example:
 if __name__ == "__main__":
-    ui = CalibrationToolUI()
+    # A client's config file can be given to calibrate it, e.g. CONFIG_left.ini
+    ui = CalibrationToolUI(sys.argv[1] if len(sys.argv) > 1 else "CONFIG.ini")
 
     try:
         ui.run()
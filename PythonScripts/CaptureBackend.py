@@ -0,0 +1,264 @@
+import ctypes
+import ctypes.wintypes as wintypes
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import pyautogui
+
+from FrameSnapshot import FrameSnapshot
+
+
+class ReplayFinished(Exception):
+    """Raised by the replay backend once every recorded frame has been served"""
+
+
+class CaptureBackend:
+    """Interface of every screen capture backend"""
+
+    def grab(self, region=None):
+        """Capture the whole screen or a region (x, y, width, height) into a FrameSnapshot"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any OS resources held by the backend"""
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """Portable backend, goes through a PIL image for every capture"""
+
+    def grab(self, region=None):
+        screenshot = pyautogui.screenshot(region=region)
+        origin = (region[0], region[1]) if region else (0, 0)
+        return FrameSnapshot(np.asarray(screenshot), origin=origin, channel_order='RGB')
+
+
+def enable_dpi_awareness():
+    """
+    Declare the process per-monitor DPI aware, so screen sizes and coordinates are physical pixels
+    on scaled displays (otherwise Windows reports, and the blit covers, the scaled down logical size)
+    """
+    user32 = ctypes.windll.user32
+    try:
+        if user32.SetProcessDpiAwarenessContext(ctypes.c_void_p(-4)):  # PER_MONITOR_AWARE_V2, Windows 10 1703+
+            return True
+    except AttributeError:
+        pass
+    try:
+        return ctypes.windll.shcore.SetProcessDpiAwareness(2) == 0  # PROCESS_PER_MONITOR_DPI_AWARE, Windows 8.1+
+    except (AttributeError, OSError):
+        return bool(user32.SetProcessDPIAware())
+
+
+class _BitmapInfoHeader(ctypes.Structure):
+    _fields_ = [
+        ('biSize', wintypes.DWORD),
+        ('biWidth', wintypes.LONG),
+        ('biHeight', wintypes.LONG),
+        ('biPlanes', wintypes.WORD),
+        ('biBitCount', wintypes.WORD),
+        ('biCompression', wintypes.DWORD),
+        ('biSizeImage', wintypes.DWORD),
+        ('biXPelsPerMeter', wintypes.LONG),
+        ('biYPelsPerMeter', wintypes.LONG),
+        ('biClrUsed', wintypes.DWORD),
+        ('biClrImportant', wintypes.DWORD),
+    ]
+
+
+class GdiBackend(CaptureBackend):
+    """
+    Windows backend that blits the screen straight into a reused NumPy buffer (BGRA), no PIL involved.
+    The returned frame shares that buffer, so it is only valid until the next grab of the same size.
+    Grabs are serialized: the detector thread and the name reads share the memory DC.
+    """
+    SRCCOPY = 0x00CC0020
+    CAPTUREBLT = 0x40000000
+    DIB_RGB_COLORS = 0
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.gdi32 = ctypes.windll.gdi32
+        self._set_signatures()
+        enable_dpi_awareness()  # Before measuring the screen
+
+        self._lock = threading.Lock()
+        self.screen_dc = self.user32.GetDC(None)
+        self.memory_dc = self.gdi32.CreateCompatibleDC(self.screen_dc)
+        self.screen_size = (self.user32.GetSystemMetrics(0), self.user32.GetSystemMetrics(1))
+        self._targets = {}  # {(width, height): (bitmap handle, numpy buffer, bitmap info)}
+
+    def _set_signatures(self):
+        """Declare handle types, the int defaults would truncate them on 64 bit Python"""
+        self.user32.GetDC.restype = wintypes.HDC
+        self.user32.GetDC.argtypes = [wintypes.HWND]
+        self.user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+        self.gdi32.CreateCompatibleDC.restype = wintypes.HDC
+        self.gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+        self.gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+        self.gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+        self.gdi32.SelectObject.restype = wintypes.HGDIOBJ
+        self.gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+        self.gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                      wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+        self.gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                         ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT]
+        self.gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+        self.gdi32.DeleteDC.argtypes = [wintypes.HDC]
+
+    def _target(self, width, height):
+        """Bitmap and destination buffer for a capture size, allocated once per size"""
+        if (width, height) not in self._targets:
+            bitmap = self.gdi32.CreateCompatibleBitmap(self.screen_dc, width, height)
+            buffer = np.empty((height, width, 4), dtype=np.uint8)
+
+            info = _BitmapInfoHeader()
+            info.biSize = ctypes.sizeof(_BitmapInfoHeader)
+            info.biWidth = width
+            info.biHeight = -height  # Negative height gives a top-down image
+            info.biPlanes = 1
+            info.biBitCount = 32
+            info.biCompression = 0  # BI_RGB
+
+            self._targets[(width, height)] = (bitmap, buffer, info)
+        return self._targets[(width, height)]
+
+    def grab(self, region=None):
+        x, y, width, height = region if region else (0, 0, *self.screen_size)
+        with self._lock:
+            bitmap, buffer, info = self._target(width, height)
+
+            self.gdi32.SelectObject(self.memory_dc, bitmap)
+            self.gdi32.BitBlt(self.memory_dc, 0, 0, width, height,
+                              self.screen_dc, x, y, self.SRCCOPY | self.CAPTUREBLT)
+            self.gdi32.GetDIBits(self.memory_dc, bitmap, 0, height,
+                                 buffer.ctypes.data, ctypes.byref(info), self.DIB_RGB_COLORS)
+
+        return FrameSnapshot(buffer, origin=(x, y), channel_order='BGRA')
+
+    def close(self):
+        with self._lock:
+            for bitmap, _, _ in self._targets.values():
+                self.gdi32.DeleteObject(bitmap)
+            self._targets.clear()
+            self.gdi32.DeleteDC(self.memory_dc)
+            self.user32.ReleaseDC(None, self.screen_dc)
+
+
+class ReplayBackend(CaptureBackend):
+    """
+    Serves recorded frames from a directory of images or a video file, so the detectors
+    can run without the game. Full screen grabs advance to the next frame, region grabs
+    crop the current one (just like a real capture taken in the same tick).
+    """
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, source, loop=False):
+        self.source = source
+        self.loop = loop
+        self.current = None
+
+        if os.path.isdir(source):
+            self.files = sorted(os.path.join(source, f) for f in os.listdir(source)
+                                if f.lower().endswith(self.IMAGE_EXTENSIONS))
+            self.video = None
+        else:
+            self.files = None
+            self.video = cv2.VideoCapture(source)
+            if not self.video.isOpened():
+                raise FileNotFoundError(f"Could not open replay source {source}")
+        self.index = 0
+
+    def _next_image(self):
+        """Read the next recorded frame as a BGR array, or None when the recording is over"""
+        if self.files is not None:
+            if self.index >= len(self.files):
+                return None
+            image = cv2.imread(self.files[self.index], cv2.IMREAD_COLOR)
+        else:
+            ok, image = self.video.read()
+            if not ok:
+                return None
+        self.index += 1
+        return image
+
+    def _rewind(self):
+        self.index = 0
+        if self.video is not None:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def grab(self, region=None):
+        if region is None or self.current is None:
+            image = self._next_image()
+            if image is None and self.loop:
+                self._rewind()
+                image = self._next_image()
+            if image is None:
+                raise ReplayFinished(f"Replay of {self.source} finished after {self.index} frames")
+            self.current = FrameSnapshot(image, channel_order='BGR')
+
+        return self.current.crop(region) if region else self.current
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+
+
+class SharedCapture(CaptureBackend):
+    """
+    One desktop capture shared by several clients: a full grab younger than max_age is handed
+    out again instead of capturing the screen once per client.
+    Frames are copied out of the backend buffers, since other threads keep using them.
+    """
+
+    def __init__(self, backend, max_age=0.05):
+        self.backend = backend
+        self.max_age = max_age
+        self.frame = None
+        self.grabs = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def grab(self, region=None):
+        with self._lock:
+            if region is not None:
+                return self.backend.grab(region).copy()
+
+            self.requests += 1
+            if self.frame is None or time.time() - self.frame.timestamp >= self.max_age:
+                self.frame = self.backend.grab().copy()
+                self.grabs += 1
+            return self.frame
+
+    def close(self):
+        self.backend.close()
+
+
+class WindowCapture(CaptureBackend):
+    """The part of a shared desktop capture covered by one game window (x, y, width, height)"""
+
+    def __init__(self, shared, window):
+        self.shared = shared
+        self.window = window
+
+    def grab(self, region=None):
+        if region is not None:
+            return self.shared.grab(region)
+        return self.shared.grab().crop(self.window)
+
+
+def create_backend(name='auto', replay_source=''):
+    """Build the capture backend selected in the config"""
+    if name == 'auto':
+        name = 'gdi' if sys.platform == 'win32' else 'pyautogui'
+
+    if name == 'gdi':
+        return GdiBackend()
+    if name == 'pyautogui':
+        return PyAutoGuiBackend()
+    if name == 'replay':
+        return ReplayBackend(replay_source)
+    raise ValueError(f"Unknown capture backend: {name}")
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+class ChangeGate:
+    """
+    Cheap change detector for a searched region: compares a subsampled copy of the pixels with
+    the one taken at the last real match, so an unchanged region can reuse the previous verdict
+    """
+
+    def __init__(self, threshold=1.0, step=4):
+        self.threshold = threshold  # Mean absolute difference (in pixel levels) that counts as a change
+        self.step = step  # Keep one pixel out of step in each direction
+        self.region = None
+        self.signature = None
+        self.checks = 0
+        self.skips = 0
+
+    def changed(self, region, image):
+        """True when the region content moved away from the reference kept at the last change"""
+        self.checks += 1
+        signature = image[::self.step, ::self.step]
+
+        if (region == self.region and self.signature is not None
+                and signature.shape == self.signature.shape
+                and np.abs(signature.astype(np.int16) - self.signature).mean() < self.threshold):
+            self.skips += 1
+            return False
+
+        # Copy, the frame may live in a capture buffer that gets overwritten
+        self.region = region
+        self.signature = signature.astype(np.int16)
+        return True
+
+    def reset(self):
+        """Forget the reference, the next check always counts as a change"""
+        self.region = None
+        self.signature = None
@@ -1,5 +1,9 @@
 import configparser
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import make_dataclass
 
 
 CONFIG_SCHEMA = {
@@ -17,12 +21,30 @@ CONFIG_SCHEMA = {
             'type': lambda x: tuple(map(int, x.strip("()").split(','))),
             'default': (0, 0, 300, 100)
         },
+        'name_offset': {  # Name region relative to the battle template match (dx, dy, width, height), empty uses name_region
+            'type': lambda x: tuple(map(int, x.strip("()").split(','))) if x.strip("() ") else None,
+            'default': ''
+        },
         'shiny_threshold': {'type': float, 'default': 0.8},
+        'shiny_window': {'type': float, 'default': 5.0},  # Seconds after a battle start the shiny message is looked for
+        'shiny_region': {  # Battle message area (x, y, width, height), empty uses shiny_offset
+            'type': lambda x: tuple(map(int, x.strip("()").split(','))) if x.strip("() ") else None,
+            'default': ''
+        },
+        'shiny_offset': {  # Battle message area relative to the battle template match (dx, dy, width, height)
+            'type': lambda x: tuple(map(int, x.strip("()").split(','))) if x.strip("() ") else None,
+            'default': '(-600, -150, 1200, 500)'  # Wide area around the battle screen, until calibrated in battle
+        },
         'battle_threshold': {'type': float, 'default': 0.8},
         'wanted_pokemon': {
             'type': lambda x: tuple(map(str, x.strip("()").replace(" ","").split(','))),
             'default': ()
-        }
+        },
+        'ocr_engine': {'type': str, 'default': 'auto'},
+        'name_cache_size': {'type': int, 'default': 128},
+        'name_cache_distance': {'type': int, 'default': 2},
+        'glyph_min_confidence': {'type': float, 'default': 0.9},
+        'ocr_timeout': {'type': float, 'default': 3.0}
     },
     'AutoCatch': {
         'sync_enabled': {'type': lambda x: True if x == "True" else False, 'default': True },
@@ -34,7 +56,17 @@ CONFIG_SCHEMA = {
     },
     'Advanced': {
         'scan_interval': {'type': float, 'default': 0.1},
-        'move_delay': {'type': float, 'default': 0.01}
+        'move_delay': {'type': float, 'default': 0.01},
+        'cpu_budget': {'type': float, 'default': 0.5},
+        'capture_backend': {'type': str, 'default': 'auto'},
+        'replay_source': {'type': str, 'default': ''},
+        'metrics_port': {'type': int, 'default': 9464},
+        'window_region': {  # Game window (x, y, width, height) when hunting with several clients
+            'type': lambda x: tuple(map(int, x.strip("()").split(','))) if x.strip("() ") else None,
+            'default': ''  # Empty: the whole screen
+        },
+        'ocr_workers': {'type': int, 'default': 2},
+        'pyramid_levels': {'type': int, 'default': 2}  # 0 searches the whole screen at full resolution
     },
     'Files': {
         'names_file': {'type': str, 'default': 'Resources/pokemon_names.txt'},
@@ -42,15 +74,29 @@ CONFIG_SCHEMA = {
         'battle_template': {'type': str, 'default': 'Resources/battle_template.png'},
         'gray_action_icon': {'type': str, 'default': 'Resources/gray_action_icon.png'},
         'red_action_icon': {'type': str, 'default': 'Resources/red_action_icon.png'},
+        'glyph_atlas': {'type': str, 'default': 'Resources/glyph_atlas.npz'},
+        'template_scale_cache': {'type': str, 'default': 'Resources/template_scale.json'},
         'shiny_sound': {'type': str, 'default': 'Resources/ShinyEncounterSound.wav'},
         'wanted_sound': {'type': str, 'default': 'Resources/WantedEncounterSound.wav'}
     },
     'Other': {
         'play_shiny_sound': {'type': lambda x: True if x == "True" else False, 'default': True},
-        'play_wanted_sound': {'type': lambda x: True if x == "True" else False, 'default': True}
+        'play_wanted_sound': {'type': lambda x: True if x == "True" else False, 'default': True},
+        'shiny_odds': {'type': int, 'default': 8192}
     }
 }
 
+# Extra normalization applied when compiling a snapshot, on top of the schema type
+SNAPSHOT_NORMALIZERS = {
+    ('OCR', 'wanted_pokemon'): lambda names: frozenset(n.strip().lower() for n in names if n.strip())
+}
+
+# Frozen, slotted classes for the compiled config: one per section plus the snapshot holding them
+SECTION_CLASSES = {
+    section: make_dataclass(f"{section}Config", list(settings), frozen=True, slots=True)
+    for section, settings in CONFIG_SCHEMA.items()
+}
+ConfigSnapshot = make_dataclass("ConfigSnapshot", list(CONFIG_SCHEMA), frozen=True, slots=True)
 
 
 class ConfigHandler:
@@ -58,11 +104,94 @@ class ConfigHandler:
         self.configParser = configparser.ConfigParser()
         self.config_path = config_path
         self.schema = CONFIG_SCHEMA
+        self._transaction_depth = 0
+        self._dirty = False
         if not os.path.exists(self.config_path):
             self.generate_default_config_file()
         else:
             self.configParser.read(config_path)
 
+        self._snapshot = self._compile(self.configParser)
+        self._file_stamp = self._stamp()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def snapshot(self):
+        """Typed, immutable view of the whole config (swapped atomically on hot reload)"""
+        return self._snapshot
+
+    def _convert(self, parser, section, option, default=None):
+        """Read one option from a parser with the schema type conversion"""
+        try:
+            value_type = self.schema[section][option]['type']
+            raw_value = parser[section][option]
+            return value_type(raw_value)
+        except (KeyError, ValueError):
+            if default is not None:
+                return default
+            # Text defaults go through the schema type like a value read from the file ('' -> None)
+            schema_default = self.schema[section][option]['default']
+            return value_type(schema_default) if isinstance(schema_default, str) else schema_default
+
+    def _compile(self, parser):
+        """Convert every option once into a ConfigSnapshot"""
+        sections = {}
+        for section, settings in self.schema.items():
+            values = {}
+            for option in settings:
+                value = self._convert(parser, section, option)
+                normalize = SNAPSHOT_NORMALIZERS.get((section, option))
+                values[option] = normalize(value) if normalize else value
+            sections[section] = SECTION_CLASSES[section](**values)
+        return ConfigSnapshot(**sections)
+
+    def _stamp(self):
+        """Modification time and size of the config file, to notice edits"""
+        try:
+            stat = os.stat(self.config_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def reload(self):
+        """Re-read the file and swap in a new snapshot, keeps the old one if the file can't be parsed"""
+        parser = configparser.ConfigParser()
+        try:
+            parser.read(self.config_path)
+            missing = [section for section in self.schema if section not in parser]
+            if missing:
+                # Most likely caught mid-write, the next change will be picked up
+                raise configparser.Error(f"missing sections {missing}")
+            snapshot = self._compile(parser)
+        except configparser.Error as e:
+            print(f"Config reload skipped: {e}")
+            return False
+
+        self.configParser = parser
+        self._snapshot = snapshot
+        return True
+
+    def watch(self, interval=1.0, on_reload=None):
+        """Poll the config file on a background thread and reload it whenever it changes"""
+        def _watch():
+            while not self._stop_watching.wait(interval):
+                stamp = self._stamp()
+                if stamp is None or stamp == self._file_stamp:
+                    continue
+                self._file_stamp = stamp
+                if self.reload():
+                    print(f"Reloaded {self.config_path}")
+                    if on_reload:
+                        on_reload(self._snapshot)
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=_watch, name="ConfigWatcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+
     def _generate_default_dict(self):
         """Generate dict with default values from schema"""
         # Use a dictionary comprehension to iterate the schema dict
@@ -90,25 +219,71 @@ class ConfigHandler:
             return False
 
     def _save_config(self):
-        """SAve current configurations onto a config file"""
-        with open(self.config_path, 'w') as f:
-            self.configParser.write(f)
+        """
+        SAve current configurations onto a config file
+        Written to a temp file that then replaces the config, so readers never see a half-written file
+        """
+        directory = os.path.dirname(os.path.abspath(self.config_path))
+        fd, temp_path = tempfile.mkstemp(prefix='.config_', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                self.configParser.write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.config_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._dirty = False
+
+        # Our own write, refresh the snapshot without waiting for the watcher
+        self._snapshot = self._compile(self.configParser)
+        self._file_stamp = self._stamp()
 
     def get(self, section, option, default=None):
         """Get value with proper type conversion using schema"""
-        try:
-            value_type = self.schema[section][option]['type']
-            raw_value = self.configParser[section][option]
-            return value_type(raw_value)
-        except (KeyError, ValueError):
-            return default if default is not None else self.schema[section][option]['default']
+        return self._convert(self.configParser, section, option, default)
 
     def set(self, section, option, value):
-        """Set value and auto-save"""
+        """Set value and auto-save (once at the end when inside a transaction, never if nothing changed)"""
+        value = str(value)
         if section not in self.configParser:
             self.configParser[section] = {}
-        self.configParser[section][option] = str(value)
-        self._save_config()
+        elif self.configParser[section].get(option) == value:
+            return
+        self.configParser[section][option] = value
+        self._dirty = True
+
+        if self._transaction_depth == 0:
+            self._save_config()
+
+    def set_many(self, changes):
+        """Apply an iterable of (section, option, value) and write the file at most once"""
+        with self.transaction():
+            for section, option, value in changes:
+                self.set(section, option, value)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group several set() calls into one write
+        If the block raises, every change made inside it is rolled back and nothing is written
+        """
+        backup = {section: dict(self.configParser[section]) for section in self.configParser.sections()}
+        was_dirty = self._dirty
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.configParser.clear()
+            self.configParser.read_dict(backup)
+            self._dirty = was_dirty
+            raise
+        finally:
+            self._transaction_depth -= 1
+
+        if self._transaction_depth == 0 and self._dirty:
+            self._save_config()
 
     def generate_default_config_file(self):
         self.configParser.read_dict(self._generate_default_dict())
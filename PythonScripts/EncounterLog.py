@@ -0,0 +1,83 @@
+import json
+import os
+import time
+from datetime import datetime
+
+
+class EncounterLog:
+    """
+    Append-only JSONL journal of the running session, one line per encounter.
+    Every line is flushed to the OS right away (survives the bot being killed) and the file is
+    fsynced periodically (survives the machine going down). A clean exit archives the journal,
+    so a journal still present at start up belongs to a session that never finished.
+    """
+    ACTIVE_NAME = 'session.jsonl'
+
+    def __init__(self, save_path='EncounterLogs', sync_interval=5.0):
+        self.save_path = save_path
+        self.path = os.path.join(save_path, self.ACTIVE_NAME)
+        self.sync_interval = sync_interval
+        self.file = None
+        self.start_time = None
+        self.last_sync = 0.0
+
+    def read_unfinished(self):
+        """
+        Records of a session that crashed before being archived
+        Returns: (start_time, [encounter records]) or None when the last session ended cleanly
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        start_time, records = None, []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn last line, everything before it is intact
+                if record.get('type') == 'session':
+                    start_time = datetime.fromisoformat(record['start_time'])
+                elif record.get('type') == 'encounter':
+                    records.append(record)
+
+        if start_time is None:
+            start_time = datetime.fromisoformat(records[0]['time']) if records else datetime.now()
+        return start_time, records
+
+    def open(self, start_time):
+        """Start the journal of a new session"""
+        self.start_time = start_time
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self._write({'type': 'session', 'start_time': start_time.isoformat()}, sync=True)
+
+    def _write(self, record, sync=False):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        if sync or time.time() - self.last_sync >= self.sync_interval:
+            os.fsync(self.file.fileno())
+            self.last_sync = time.time()
+
+    def append(self, pokemon_name, confidence=None, battle_duration=None, timestamp=None):
+        """Journal one encounter"""
+        self._write({
+            'type': 'encounter',
+            'time': (timestamp or datetime.now()).isoformat(),
+            'name': pokemon_name,
+            'confidence': confidence,
+            'battle_duration': battle_duration
+        })
+
+    def archive(self, start_time=None):
+        """Close the journal and move it out of the way, marking the session as finished"""
+        if self.file is not None:
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+        if os.path.exists(self.path):
+            start_time = start_time or self.start_time or datetime.now()
+            archived = os.path.join(self.save_path, f"encounters_{start_time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+            os.replace(self.path, archived)
+            return archived
+        return None
@@ -0,0 +1,101 @@
+import time
+from collections import deque
+
+
+class RollingStats:
+    """
+    Encounter statistics updated in O(1) per encounter, so a live summary never needs a re-scan:
+    per species counts kept in ranking order, encounters/hour over sliding windows,
+    mean time between encounters and the expected time until a shiny.
+    """
+
+    def __init__(self, windows=(600, 3600), shiny_odds=8192, start_time=None):
+        self.start_time = start_time if start_time is not None else time.time()
+        self.shiny_odds = shiny_odds  # A shiny is expected once every shiny_odds encounters
+
+        self.counts = {}  # {species: count}
+        self.total = 0
+
+        # Species ordered by count (descending). Equal counts are contiguous, block_start[c]
+        # is the index of the first species with count c, which makes an increment a single swap.
+        self._order = []
+        self._position = {}
+        self._block_start = {}
+
+        self.windows = {seconds: deque() for seconds in windows}  # {window: encounter timestamps}
+        self.first_time = None
+        self.last_time = None
+
+    def _increment(self, species):
+        if species not in self.counts:
+            self.counts[species] = 0
+            self._position[species] = len(self._order)
+            self._order.append(species)
+            self._block_start.setdefault(0, len(self._order) - 1)
+
+        count = self.counts[species]
+        i, j = self._position[species], self._block_start[count]
+
+        # Swap to the front of its block, then it belongs to the block of count + 1 right before
+        other = self._order[j]
+        self._order[i], self._order[j] = other, species
+        self._position[other], self._position[species] = i, j
+
+        if j + 1 < len(self._order) and self.counts[self._order[j + 1]] == count:
+            self._block_start[count] = j + 1
+        else:
+            del self._block_start[count]
+        self._block_start.setdefault(count + 1, j)
+        self.counts[species] = count + 1
+
+    def add(self, species, timestamp=None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        self._increment(species)
+        self.total += 1
+
+        if self.first_time is None:
+            self.first_time = timestamp
+        self.last_time = timestamp
+
+        for seconds, stamps in self.windows.items():
+            stamps.append(timestamp)
+            self._expire(seconds, stamps, timestamp)
+
+    @staticmethod
+    def _expire(seconds, stamps, now):
+        while stamps and stamps[0] <= now - seconds:
+            stamps.popleft()
+
+    def ranking(self, top=None):
+        """[(species, count)] most common first"""
+        species = self._order if top is None else self._order[:top]
+        return [(name, self.counts[name]) for name in species]
+
+    def rate_per_hour(self, seconds, now=None):
+        """Encounters per hour over the last `seconds` (or since the start if shorter)"""
+        now = now if now is not None else time.time()
+        stamps = self.windows[seconds]
+        self._expire(seconds, stamps, now)
+        span = min(seconds, now - self.start_time)
+        return len(stamps) * 3600 / span if span > 0 else 0.0
+
+    def mean_time_between(self):
+        """Mean seconds between two encounters, None until there are two"""
+        if self.total < 2:
+            return None
+        return (self.last_time - self.first_time) / (self.total - 1)
+
+    def expected_time_to_shiny(self):
+        """Expected seconds until the next shiny at the current pace (the odds have no memory)"""
+        mean_time = self.mean_time_between()
+        return mean_time * self.shiny_odds if mean_time is not None else None
+
+    def summary(self, top=5, now=None):
+        now = now if now is not None else time.time()
+        return {
+            'total': self.total,
+            'top': self.ranking(top),
+            'rates_per_hour': {seconds: self.rate_per_hour(seconds, now) for seconds in self.windows},
+            'mean_time_between': self.mean_time_between(),
+            'expected_time_to_shiny': self.expected_time_to_shiny()
+        }
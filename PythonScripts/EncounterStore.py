@@ -0,0 +1,265 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    start_time TEXT NOT NULL UNIQUE,
+    end_time TEXT,
+    source TEXT NOT NULL DEFAULT 'live'
+);
+CREATE TABLE IF NOT EXISTS encounters (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    time TEXT NOT NULL,
+    species TEXT NOT NULL,
+    confidence REAL,
+    battle_duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_encounters_species_time ON encounters(species, time);
+CREATE INDEX IF NOT EXISTS idx_encounters_session ON encounters(session_id);
+CREATE INDEX IF NOT EXISTS idx_encounters_time ON encounters(time);
+"""
+
+
+class EncounterStore:
+    """
+    SQLite database holding the encounters of every session, for queries across sessions.
+    Live writes are buffered and inserted in batches.
+    """
+
+    def __init__(self, db_path='EncounterLogs/encounters.db', batch_size=50, flush_interval=30.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.last_flush = time.time()
+
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+
+    # -- Writing --
+
+    @staticmethod
+    def _session_key(start_time):
+        """Sessions are identified by their start second, like the encounters_<timestamp> files"""
+        return start_time.replace(microsecond=0).isoformat()
+
+    def start_session(self, start_time, source='live'):
+        """Id of the session starting at start_time, created if needed"""
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO sessions (start_time, source) VALUES (?, ?)",
+                                    (self._session_key(start_time), source))
+        row = self.connection.execute("SELECT id FROM sessions WHERE start_time = ?",
+                                      (self._session_key(start_time),)).fetchone()
+        return row[0]
+
+    def add_encounter(self, session_id, species, timestamp=None, confidence=None, battle_duration=None):
+        """Buffer one encounter, written with the next batch"""
+        self.pending.append((session_id, (timestamp or datetime.now()).isoformat(),
+                             species, confidence, battle_duration))
+        if len(self.pending) >= self.batch_size or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO encounters (session_id, time, species, confidence, battle_duration) "
+                    "VALUES (?, ?, ?, ?, ?)", self.pending)
+            self.pending.clear()
+        self.last_flush = time.time()
+
+    def end_session(self, session_id, end_time=None):
+        self.flush()
+        with self.connection:
+            self.connection.execute("UPDATE sessions SET end_time = ? WHERE id = ?",
+                                    ((end_time or datetime.now()).isoformat(), session_id))
+
+    def replace_session(self, start_time, records, end_time=None, source='journal'):
+        """Store a whole session at once, replacing whatever part of it was already written"""
+        self.flush()
+        session_id = self.start_session(start_time, source)
+        with self.connection:
+            self.connection.execute("DELETE FROM encounters WHERE session_id = ?", (session_id,))
+            self.connection.executemany(
+                "INSERT INTO encounters (session_id, time, species, confidence, battle_duration) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(session_id, r['time'], r['name'], r.get('confidence'), r.get('battle_duration'))
+                 for r in records if r.get('name')])
+            self.connection.execute("UPDATE sessions SET end_time = ? WHERE id = ?",
+                                    ((end_time or start_time).isoformat(), session_id))
+        return session_id
+
+    def has_session(self, start_time):
+        return self.connection.execute("SELECT 1 FROM sessions WHERE start_time = ?",
+                                       (self._session_key(start_time),)).fetchone() is not None
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    # -- Queries --
+
+    @staticmethod
+    def _time_filter(since, until, column='time'):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append(f"{column} < ?")
+            params.append(until.isoformat())
+        return (" AND ".join(clauses) or "1"), params
+
+    def species_rate(self, species, since=None, until=None):
+        """(encounters of species, all encounters, share of species) in the time range"""
+        where, params = self._time_filter(since, until)
+        total, count = self.connection.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(species = ? COLLATE NOCASE), 0) FROM encounters WHERE {where}",
+            [species] + params).fetchone()
+        return count, total, (count / total if total else 0.0)
+
+    def species_summary(self, since=None, until=None):
+        """[(species, count, share)] in the time range, most common first"""
+        where, params = self._time_filter(since, until)
+        rows = self.connection.execute(
+            f"SELECT species, COUNT(*) FROM encounters WHERE {where} GROUP BY species ORDER BY COUNT(*) DESC",
+            params).fetchall()
+        total = sum(count for _, count in rows)
+        return [(species, count, count / total) for species, count in rows]
+
+    def encounters_per_hour(self, since=None, until=None):
+        """Encounter rate over the hunting time (session durations) in the time range"""
+        where, params = self._time_filter(since, until)
+        count, = self.connection.execute(f"SELECT COUNT(*) FROM encounters WHERE {where}", params).fetchone()
+
+        where, params = self._time_filter(since, until, column='start_time')
+        hours = 0.0
+        for start, end in self.connection.execute(
+                f"SELECT start_time, end_time FROM sessions WHERE end_time IS NOT NULL AND {where}", params):
+            hours += (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() / 3600
+        return count / hours if hours > 0 else 0.0
+
+    # -- Importing the per session files --
+
+    def import_logs(self, logs_path='EncounterLogs'):
+        """
+        Import the encounters_<timestamp>.jsonl/.json/.csv files of past sessions, once per session
+        JSON and CSV files only hold counts, so their encounters are all dated at the session start.
+        Returns the number of sessions imported.
+        """
+        sessions = {}
+        for path in glob.glob(os.path.join(logs_path, 'encounters_*.*')):
+            stem, extension = os.path.splitext(os.path.basename(path))
+            if extension in ('.jsonl', '.json', '.csv'):
+                sessions.setdefault(stem, {})[extension] = path
+
+        imported = 0
+        for stem, files in sorted(sessions.items()):
+            start_time = datetime.strptime(stem[len('encounters_'):], '%Y%m%d_%H%M%S')
+            if self.has_session(start_time):
+                continue
+
+            # Prefer the journal, it has one line per encounter
+            if '.jsonl' in files:
+                records, end_time = self._read_journal(files['.jsonl'])
+            elif '.json' in files:
+                records, end_time = self._read_summary_json(files['.json'], start_time)
+            else:
+                records, end_time = self._read_summary_csv(files['.csv'], start_time)
+
+            self.replace_session(start_time, records, end_time, source='import')
+            imported += 1
+        return imported
+
+    @staticmethod
+    def _read_journal(path):
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if record.get('type') == 'encounter':
+                    records.append(record)
+        end_time = datetime.fromisoformat(records[-1]['time']) if records else None
+        return records, end_time
+
+    @staticmethod
+    def _parse_duration(text):
+        """Session duration as written by str(timedelta)"""
+        hours, minutes, seconds = text.split(', ')[-1].split(':')
+        days = int(text.split(' day')[0]) if 'day' in text else 0
+        return timedelta(days=days, hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+    @classmethod
+    def _read_summary_json(cls, path, start_time):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        records = [{'time': start_time.isoformat(), 'name': name}
+                   for name, count in data.get('by_pokemon', {}).items() for _ in range(count)]
+        end_time = start_time + cls._parse_duration(data['session_duration']) if 'session_duration' in data else None
+        return records, end_time
+
+    @classmethod
+    def _read_summary_csv(cls, path, start_time):
+        records, end_time = [], None
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+
+        for row in rows[1:]:
+            if not row:
+                break
+            records.extend({'time': start_time.isoformat(), 'name': row[0]} for _ in range(int(row[1])))
+        for row in rows:
+            if row and row[0] == 'Session Duration':
+                end_time = start_time + cls._parse_duration(row[1])
+        return records, end_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the encounter database")
+    parser.add_argument('--db', default='EncounterLogs/encounters.db', help="Database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rate = commands.add_parser('rate', help="Encounter rate of one species")
+    rate.add_argument('species')
+    rate.add_argument('--days', type=float, help="Only the last N days")
+
+    summary = commands.add_parser('summary', help="Encounter share of every species")
+    summary.add_argument('--days', type=float, help="Only the last N days")
+
+    import_logs = commands.add_parser('import', help="Import the JSON/CSV/JSONL files of past sessions")
+    import_logs.add_argument('logs_path', nargs='?', default='EncounterLogs')
+
+    args = parser.parse_args()
+    store = EncounterStore(args.db)
+    since = datetime.now() - timedelta(days=args.days) if getattr(args, 'days', None) else None
+
+    if args.command == 'rate':
+        count, total, share = store.species_rate(args.species, since)
+        if count:
+            print(f"{args.species}: {count} of {total} encounters ({share:.2%}), 1 in {total / count:.1f}")
+        else:
+            print(f"{args.species}: 0 of {total} encounters")
+    elif args.command == 'summary':
+        for species, count, share in store.species_summary(since):
+            print(f"  {species}: {count} ({share:.1%})")
+        print(f"Encounters per hour: {store.encounters_per_hour(since):.1f}")
+    elif args.command == 'import':
+        print(f"Imported {store.import_logs(args.logs_path)} sessions")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
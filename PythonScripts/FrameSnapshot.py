@@ -0,0 +1,80 @@
+import time
+
+import cv2
+import numpy as np
+
+
+# cvtColor codes to reach each view from the channel orders the capture backends produce
+_TO_BGR = {'RGB': cv2.COLOR_RGB2BGR, 'BGRA': cv2.COLOR_BGRA2BGR}
+_TO_GRAY = {'RGB': cv2.COLOR_RGB2GRAY, 'BGR': cv2.COLOR_BGR2GRAY, 'BGRA': cv2.COLOR_BGRA2GRAY}
+
+
+class FrameSnapshot:
+    """
+    A single screen capture shared by every detector during one loop tick.
+    The gray and BGR views are only computed the first time they are requested.
+    """
+
+    def __init__(self, image, origin=(0, 0), timestamp=None, channel_order='RGB'):
+        self.pixels = image if isinstance(image, np.ndarray) else np.asarray(image)
+        self.channel_order = channel_order  # 'RGB', 'BGR' or 'BGRA', depends on the capture backend
+        self._bgr = self.pixels if channel_order == 'BGR' else None
+        self._gray = None
+        self.origin = origin  # Screen coordinates of the top left pixel
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    @property
+    def width(self):
+        return self.pixels.shape[1]
+
+    @property
+    def height(self):
+        return self.pixels.shape[0]
+
+    @property
+    def region(self):
+        """Screen region (x, y, width, height) covered by the frame"""
+        return self.origin[0], self.origin[1], self.width, self.height
+
+    @property
+    def bgr(self):
+        """Color view in OpenCV channel order"""
+        if self._bgr is None:
+            self._bgr = cv2.cvtColor(self.pixels, _TO_BGR[self.channel_order])
+        return self._bgr
+
+    @property
+    def gray(self):
+        """Single channel view used by the grayscale templates"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.pixels, _TO_GRAY[self.channel_order])
+        return self._gray
+
+    def copy(self):
+        """Detach the snapshot from a backend buffer that gets reused by the next capture"""
+        copied = FrameSnapshot(self.pixels.copy(), origin=self.origin,
+                               timestamp=self.timestamp, channel_order=self.channel_order)
+        if self._gray is not None:
+            copied._gray = self._gray.copy()
+        return copied
+
+    def crop(self, region):
+        """
+        Return a snapshot of a screen region (x, y, width, height) without copying pixels.
+        Region is in screen coordinates, views that were already computed are sliced too.
+        """
+        x, y, w, h = region
+        x0 = max(0, x - self.origin[0])
+        y0 = max(0, y - self.origin[1])
+        x1 = min(self.width, x - self.origin[0] + w)
+        y1 = min(self.height, y - self.origin[1] + h)
+
+        cropped = FrameSnapshot(self.pixels[y0:y1, x0:x1],
+                                origin=(self.origin[0] + x0, self.origin[1] + y0),
+                                timestamp=self.timestamp,
+                                channel_order=self.channel_order)
+        if self._bgr is not None:
+            cropped._bgr = self._bgr[y0:y1, x0:x1]
+        if self._gray is not None:
+            cropped._gray = self._gray[y0:y1, x0:x1]
+        return cropped
@@ -0,0 +1,109 @@
+import threading
+import time
+from enum import Enum
+
+
+class GameEvent(Enum):
+    SHINY_SEEN = "shiny_seen"
+    BATTLE_STARTED = "battle_started"
+    ACTION_READY = "action_ready"
+    ACTION_BUSY = "action_busy"
+    BATTLE_ENDED = "battle_ended"
+    DETECTOR_STOPPED = "detector_stopped"  # The thread died, see StateEvent.error
+
+
+class StateEvent:
+    """A game state transition seen by the detector"""
+    __slots__ = ('type', 'timestamp', 'error')
+
+    def __init__(self, event_type, timestamp=None, error=None):
+        self.type = event_type
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.error = error
+
+    def __repr__(self):
+        return f"StateEvent({self.type.name}, {self.timestamp:.3f})"
+
+
+class GameStateDetector(threading.Thread):
+    """
+    Captures and classifies frames continuously on its own thread and publishes every
+    state transition, so detection keeps running while the hunter is busy sending input.
+    publish is called from the detector thread with a StateEvent.
+    """
+
+    def __init__(self, elements_ocr, publish, scheduler, profiler=None, config_handler=None):
+        super().__init__(name="GameStateDetector", daemon=True)
+        self.elementsOCR = elements_ocr
+        self.publish = publish
+        self.scheduler = scheduler  # Decides the wait between scans
+        self.profiler = profiler  # Profiles the scan loop when running with --profile
+        self.configHandler = config_handler  # Shiny settings, read every tick so edits apply live
+        self._stop_event = threading.Event()
+
+        # Last known state, only written by the detector thread
+        self.in_battle = False
+        self.action_ready = None  # Unknown outside of battles
+        self.shiny_seen = False
+        self.battle_start = 0.0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _emit(self, event_type, timestamp):
+        self.scheduler.record_transition(timestamp)
+        self.publish(StateEvent(event_type, timestamp))
+
+    def _shiny_settings(self):
+        """
+        (threshold, seconds after the battle start, message region or None)
+        The region is the calibrated one, else the area at shiny_offset from the battle screen just matched
+        """
+        if self.configHandler is None:
+            return 0.8, 5.0, None
+        ocr = self.configHandler.snapshot.OCR
+        region = ocr.shiny_region or None
+        if region is None and ocr.shiny_offset:
+            region = self.elementsOCR.anchored_region(ocr.shiny_offset)
+        return ocr.shiny_threshold, ocr.shiny_window, region
+
+    def _classify(self, frame):
+        """Run the detectors on one frame and publish whatever changed"""
+        in_battle = self.elementsOCR.is_in_battle(frame=frame)
+        if in_battle and not self.in_battle:
+            self.battle_start = frame.timestamp
+
+        # The shiny message only shows as a battle starts: check the battle entry frame and the few after it
+        threshold, window, region = self._shiny_settings()
+        if (in_battle and not self.shiny_seen and frame.timestamp - self.battle_start <= window
+                and self.elementsOCR.is_shiny_present(frame=frame, threshold=threshold, region=region)):
+            self.shiny_seen = True
+            self._emit(GameEvent.SHINY_SEEN, frame.timestamp)
+
+        if in_battle != self.in_battle:
+            self.in_battle = in_battle
+            self.action_ready = None
+            self._emit(GameEvent.BATTLE_STARTED if in_battle else GameEvent.BATTLE_ENDED, frame.timestamp)
+
+        # The action icon only exists during battles
+        if in_battle:
+            action_ready = self.elementsOCR.is_action_ready(frame=frame)
+            if action_ready != self.action_ready:
+                self.action_ready = action_ready
+                self._emit(GameEvent.ACTION_READY if action_ready else GameEvent.ACTION_BUSY, frame.timestamp)
+
+        self.scheduler.set_battle_state(self.in_battle, self.action_ready)
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                tick_start = time.time()
+                self._classify(self.elementsOCR.capture_frame())
+                if self.profiler is not None:
+                    self.profiler.tick('detector')
+                self._stop_event.wait(self.scheduler.next_delay(tick_start, time.time() - tick_start))
+        except Exception as e:
+            self.publish(StateEvent(GameEvent.DETECTOR_STOPPED, error=e))
+        finally:
+            if self.profiler is not None:
+                self.profiler.detach('detector')
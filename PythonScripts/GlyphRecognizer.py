@@ -0,0 +1,140 @@
+import os
+
+import cv2
+import numpy as np
+
+
+class GlyphRecognizer:
+    """
+    Reads the battle name (fixed game font) without OCR: the binarized crop is split into glyphs
+    by column projection and every glyph is compared with a per-character template atlas.
+    The atlas is learned from a few labeled crops.
+    Every glyph spans the same rows, from the top of the text (names start with a capital) to the
+    bottom of the crop, so all glyphs share one scale and keep their vertical offset: a descender
+    anywhere in the name doesn't rescale the other letters.
+    The crop must be binarized without dilation, which would merge the glyphs of light text.
+    """
+    GLYPH_SIZE = (20, 32)  # (width, height) every glyph is normalized to
+    SPACE_GAP = 0.3  # Gap between glyphs (relative to the text height) that counts as a space
+    MAX_SAMPLES = 5  # Templates kept per character
+
+    def __init__(self, atlas_path=None):
+        self.atlas_path = atlas_path
+        self.samples = {}  # {char: [glyph vectors]}
+        self._templates = None  # Stacked atlas (n, pixels), rebuilt after learning
+        self._labels = None
+
+        if atlas_path and os.path.exists(atlas_path):
+            self.load(atlas_path)
+
+    @property
+    def ready(self):
+        return bool(self.samples)
+
+    @staticmethod
+    def _text_mask(binary_image):
+        """Boolean mask of the text pixels, whatever the binarization polarity"""
+        mask = binary_image > 0
+        return ~mask if mask.mean() > 0.5 else mask
+
+    def segment(self, binary_image):
+        """
+        Split the crop into glyph masks, left to right
+        Returns: list of glyph masks (None marks a space)
+        """
+        mask = self._text_mask(binary_image)
+        rows = np.flatnonzero(mask.any(axis=1))
+        if rows.size == 0:
+            return []
+        text_height = rows[-1] + 1 - rows[0]
+        mask = mask[rows[0]:]  # Down to the crop bottom, whatever letters the name has
+
+        # Runs of consecutive columns that contain ink
+        ink = mask.any(axis=0).astype(np.int8)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], ink, [0]))))
+        starts, ends = edges[::2], edges[1::2]
+
+        glyphs = []
+        space_gap = self.SPACE_GAP * text_height
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            if i > 0 and start - ends[i - 1] > space_gap:
+                glyphs.append(None)
+            glyphs.append(mask[:, start:end])
+        return glyphs
+
+    def _normalize(self, glyph):
+        """Scale a glyph (text top to crop bottom) to the canvas height and center it, as a flat vector"""
+        width, height = self.GLYPH_SIZE
+        scale = height / glyph.shape[0]
+        scaled_width = min(width, max(1, round(glyph.shape[1] * scale)))
+        resized = cv2.resize(glyph.astype(np.uint8) * 255, (scaled_width, height),
+                             interpolation=cv2.INTER_AREA)
+
+        canvas = np.zeros((height, width), dtype=np.float32)
+        offset = (width - scaled_width) // 2
+        canvas[:, offset:offset + scaled_width] = resized > 127
+        return canvas.ravel()
+
+    def _rebuild(self):
+        labels, templates = [], []
+        for char, vectors in self.samples.items():
+            labels.extend([char] * len(vectors))
+            templates.extend(vectors)
+        self._labels = np.array(labels)
+        self._templates = np.stack(templates) if templates else None
+
+    def learn(self, binary_image, label):
+        """
+        Add the glyphs of a crop whose text is known to the atlas
+        Returns False when the segmentation doesn't line up with the label
+        """
+        glyphs = [g for g in self.segment(binary_image) if g is not None]
+        chars = [c for c in label if c != ' ']
+        if not glyphs or len(glyphs) != len(chars):
+            return False
+
+        for char, glyph in zip(chars, glyphs):
+            vectors = self.samples.setdefault(char, [])
+            vectors.append(self._normalize(glyph))
+            del vectors[:-self.MAX_SAMPLES]
+        self._rebuild()
+        return True
+
+    def recognize(self, binary_image):
+        """
+        Read the crop with the atlas
+        Returns: (text, confidence) where confidence is the similarity of the worst matched glyph
+        """
+        if self._templates is None:
+            return "", 0.0
+        glyphs = self.segment(binary_image)
+        letters = [g for g in glyphs if g is not None]
+        if not letters:
+            return "", 0.0
+
+        # Hamming distance of every glyph to every template: |g| + |t| - 2 g.t
+        vectors = np.stack([self._normalize(g) for g in letters])
+        distances = (vectors.sum(axis=1)[:, None] + self._templates.sum(axis=1)[None, :]
+                     - 2.0 * vectors @ self._templates.T)
+        best = distances.argmin(axis=1)
+        similarity = 1.0 - distances[np.arange(len(letters)), best] / vectors.shape[1]
+
+        chars = iter(self._labels[best])
+        text = "".join(" " if g is None else next(chars) for g in glyphs)
+        return text, float(similarity.min())
+
+    def save(self, atlas_path=None):
+        atlas_path = atlas_path or self.atlas_path
+        if self._templates is None or not atlas_path:
+            return
+        np.savez_compressed(atlas_path, labels=self._labels, templates=self._templates)
+
+    def load(self, atlas_path):
+        data = np.load(atlas_path)
+        self.samples = {}
+        if data['templates'].shape[1:] != (self.GLYPH_SIZE[0] * self.GLYPH_SIZE[1],):
+            print(f"Ignoring the glyph atlas {atlas_path}, it was learned with another glyph format")
+            return
+        for char, vector in zip(data['labels'], data['templates']):
+            self.samples.setdefault(str(char), []).append(vector.astype(np.float32))
+        self._rebuild()
@@ -0,0 +1,80 @@
+import asyncio
+import ctypes
+import ctypes.wintypes as wintypes
+import sys
+
+import keyboard
+
+from Metrics import METRICS
+
+
+GA_ROOT = 2
+_NOT_HELD = object()
+
+
+def focus_window(window):
+    """Bring the top level window covering the center of a screen region (x, y, width, height) to the front"""
+    if sys.platform != 'win32':
+        return False
+    user32 = ctypes.windll.user32
+    x, y, w, h = window
+    hwnd = user32.WindowFromPoint(wintypes.POINT(x + w // 2, y + h // 2))
+    if not hwnd:
+        return False
+    return bool(user32.SetForegroundWindow(user32.GetAncestor(hwnd, GA_ROOT)))
+
+
+class InputDispatcher:
+    """
+    Single consumer of key commands, so movement and battle input never interleave.
+    With several game clients, a command carries its client's window: the window is focused
+    before the keys are sent, and keys still held for the previous window are released first.
+    """
+
+    def __init__(self, focus_delay=0.05):
+        self.queue = asyncio.Queue()
+        self.focus_delay = focus_delay  # Time for the game to take the focus before it gets input
+        self.focused = None
+        self.held = {}  # {key: window it is held for}
+
+    async def send(self, action, key, window=None):
+        """Queue a key command ("tap", "press" or "release") and wait until it was sent"""
+        done = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((action, key, window, done))
+        await done
+
+    async def _focus(self, window):
+        if window is None or window == self.focused:
+            return
+        # The other client's walk just ends early, its next step presses the key again
+        for key in self.held:
+            keyboard.release(key)
+        self.held.clear()
+
+        focus_window(window)
+        self.focused = window
+        await asyncio.sleep(self.focus_delay)
+
+    async def run(self):
+        while True:
+            action, key, window, done = await self.queue.get()
+            if action == "release" and self.held.get(key, _NOT_HELD) != window:
+                done.set_result(None)  # Already released by a focus change, don't take the focus back for it
+                continue
+            await self._focus(window)
+
+            if action == "tap":
+                with METRICS.timer('key_dispatch'):
+                    keyboard.press(key)
+                await asyncio.sleep(0.1)
+                with METRICS.timer('key_dispatch'):
+                    keyboard.release(key)
+            elif action == "press":
+                with METRICS.timer('key_dispatch'):
+                    keyboard.press(key)
+                self.held[key] = window
+            else:
+                with METRICS.timer('key_dispatch'):
+                    keyboard.release(key)
+                self.held.pop(key, None)
+            done.set_result(None)
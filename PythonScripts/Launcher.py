@@ -1,7 +1,8 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk
 from ConfigHandler import ConfigHandler
-from PokemonHunter import ShinyCatcher
+from PokemonHunter import ShinyCatcher, add_profile_arguments, profiler_from_args
 
 # Configuration schema: (section, option, widget, widget_type, transform_func)
 WIDGET_CONFIG_SCHEMA = [
@@ -72,8 +73,9 @@ WIDGET_CONFIG_SCHEMA = [
 
 
 class AutoCatcherLauncher:
-    def __init__(self, config_path="CONFIG.ini"):
+    def __init__(self, config_path="CONFIG.ini", profiler=None):
         self.config_path = config_path
+        self.profiler = profiler  # Handed to the bot when started with --profile
         self.config_handler = ConfigHandler(config_path)
         self.root = tk.Tk()
         self.widgets = {}  # Store all widget references
@@ -175,25 +177,18 @@ class AutoCatcherLauncher:
 
     def _start_bot(self):
         """Update config from UI and start bot"""
-        # Update config using schema
-        for item in WIDGET_CONFIG_SCHEMA:
-            section = item['section']
-            option = item['option']
-            widget_value = self._get_widget_value(item['widget'], item['widget_type'])
-
-            # Apply transformation if needed
-            transformed_value = item['transform'](widget_value)
+        # Update config using schema, written once at the end of the transaction
+        with self.config_handler.transaction():
+            for item in WIDGET_CONFIG_SCHEMA:
+                section = item['section']
+                option = item['option']
+                widget_value = self._get_widget_value(item['widget'], item['widget_type'])
 
-            # Ensure section exists
-            if section not in self.config_handler.configParser:
-                self.config_handler.configParser[section] = {}
+                # Apply transformation if needed
+                transformed_value = item['transform'](widget_value)
 
-            # Update config value
-            self.config_handler.configParser[section][option] = transformed_value
-
-        # Save config
-        #TODO: Implement Bulk save in ConfigHandler() instead of full rewrite
-        self.config_handler._save_config()
+                # Update config value
+                self.config_handler.set(section, option, transformed_value)
 
         # Close and start bot
         self.root.destroy()
@@ -201,7 +196,7 @@ class AutoCatcherLauncher:
 
 
     def _run_bot(self):
-        sc = ShinyCatcher(self.config_path)
+        sc = ShinyCatcher(self.config_path, self.profiler)
         sc.main()
 
     def run(self):
@@ -428,5 +423,10 @@ class TagEntry(ttk.Frame):
 
 
 if __name__ == "__main__":
-    launcher = AutoCatcherLauncher()
+    parser = argparse.ArgumentParser(description="PROAutoBot launcher")
+    parser.add_argument('--config', default="CONFIG.ini", help="Config file")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    launcher = AutoCatcherLauncher(args.config, profiler_from_args(args))
     launcher.run()
\ No newline at end of file
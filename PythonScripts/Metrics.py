@@ -0,0 +1,143 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds (seconds) of the latency buckets, from half a millisecond to a few seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LatencyHistogram:
+    """Fixed bucket histogram: recording a value is a bisect and two additions"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        """Estimate of the q quantile, interpolated inside its bucket"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Latency histograms per pipeline stage (capture, template matching, OCR, ...)"""
+    METRIC_NAME = 'proautobot_stage_seconds'
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the body of a with block into the stage histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def render_prometheus(self):
+        """All histograms in the Prometheus text exposition format"""
+        lines = [f"# HELP {self.METRIC_NAME} Time spent in each stage of the bot pipeline",
+                 f"# TYPE {self.METRIC_NAME} histogram"]
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.METRIC_NAME}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.METRIC_NAME}_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{self.METRIC_NAME}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self):
+        """One line per stage with the p50/p99 estimates, for the console"""
+        return [f"{stage}: {h.count} calls, p50 {h.quantile(0.5) * 1000:.2f} ms, p99 {h.quantile(0.99) * 1000:.2f} ms"
+                for stage, h in sorted(self.histograms.items())]
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        return path
+
+
+# Registry shared by every module of the bot
+METRICS = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves a registry on http://127.0.0.1:<port>/metrics from a daemon thread"""
+
+    def __init__(self, registry=METRICS, port=9464, host='127.0.0.1'):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry_ref.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve_metrics(port, registry=METRICS):
+    """Start a MetricsServer when a port is configured, None when disabled or the port is taken"""
+    if not port:
+        return None
+    try:
+        server = MetricsServer(registry, port).start()
+        print(f"Metrics served on http://127.0.0.1:{port}/metrics")
+        return server
+    except OSError as e:
+        print(f"Metrics server error: {e}")
+        return None
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class NameCache:
+    """
+    Bounded LRU cache of OCR results keyed by the binarized name crop, downsampled to a fine grid.
+    The game draws a name the same way every time, so a key within max_distance bits of cached ones
+    only counts as a hit when all of them are the same name: one letter apart names (Latias/Latios)
+    differ by far more bits than that, and a near-hit never picks between two different names.
+    """
+    HASH_SIZE = (160, 40)  # (width, height) the crop is reduced to, one bit per cell of about 2x2 pixels
+
+    def __init__(self, max_size=128, max_distance=2):
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self.entries = OrderedDict()  # {hash: name}, most recently used last
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def image_hash(cls, binary_image):
+        """Cells of the (already binarized) crop that are mostly ink, as a Python int"""
+        small = cv2.resize(binary_image, cls.HASH_SIZE, interpolation=cv2.INTER_AREA)
+        bits = (small >= 128).ravel()
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+    def _find(self, key):
+        """Cached hash equal or closest to key (within max_distance), None if there is none or it is ambiguous"""
+        if key in self.entries:
+            return key
+
+        best, best_distance, names = None, self.max_distance + 1, set()
+        for cached, read in self.entries.items():
+            distance = (cached ^ key).bit_count()
+            if distance <= self.max_distance:
+                names.add(read.name)
+                if distance < best_distance:
+                    best, best_distance = cached, distance
+        return best if len(names) == 1 else None
+
+    def get(self, key):
+        """Return (found, name) for a crop hash"""
+        cached = self._find(key)
+        if cached is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        self.entries.move_to_end(cached)
+        return True, self.entries[cached]
+
+    def put(self, key, name):
+        self.entries[key] = name
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self.entries)
+        }
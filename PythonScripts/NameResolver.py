@@ -0,0 +1,80 @@
+import heapq
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+
+
+class NameResolver:
+    """
+    Prebuilt index over the known Pokémon names that returns the same best match as
+    difflib.get_close_matches, without running SequenceMatcher against every name.
+
+    Every name is stored as a row of character counts. The character overlap gives an upper
+    bound of the similarity ratio (difflib's quick_ratio), computed for all names at once with
+    NumPy, so the exact ratio only runs on the few names that can still reach the cutoff.
+    """
+    _shared = {}
+
+    def __init__(self, names, cutoff=0.6):
+        self.names = list(names)
+        self.cutoff = cutoff
+
+        alphabet = sorted({char for name in self.names for char in name})
+        self.char_index = {char: i for i, char in enumerate(alphabet)}
+        self.counts = np.zeros((len(self.names), len(alphabet)), dtype=np.int32)
+        for row, name in enumerate(self.names):
+            for char in name:
+                self.counts[row, self.char_index[char]] += 1
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int32)
+
+        self.resolve = lru_cache(maxsize=1024)(self._resolve)
+
+    @classmethod
+    def shared(cls, names):
+        """One resolver per names list, built on first use and reused by every caller"""
+        key = tuple(names)
+        if key not in cls._shared:
+            cls._shared[key] = cls(key)
+        return cls._shared[key]
+
+    def _query_counts(self, word):
+        counts = np.zeros(self.counts.shape[1], dtype=np.int32)
+        for char in word:
+            index = self.char_index.get(char)
+            if index is not None:
+                counts[index] += 1
+        return counts
+
+    def candidates(self, word, k=5, cutoff=None):
+        """
+        Top k names with a similarity ratio >= cutoff, as [(name, score)] best first
+        Ties are ordered like difflib (the larger string first).
+        """
+        cutoff = self.cutoff if cutoff is None else cutoff
+
+        # Upper bound of the ratio for every name at once
+        common = np.minimum(self.counts, self._query_counts(word)).sum(axis=1)
+        total = self.lengths + len(word)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bound = np.where(total > 0, 2.0 * common / total, 1.0)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        scored = []
+        for row in np.flatnonzero(bound >= cutoff):
+            name = self.names[row]
+            matcher.set_seq1(name)
+            score = matcher.ratio()
+            if score >= cutoff:
+                scored.append((score, name))
+
+        return [(name, score) for score, name in heapq.nlargest(k, scored)]
+
+    def _resolve(self, word):
+        """Best match and its score, (None, 0.0) when nothing reaches the cutoff"""
+        matches = self.candidates(word, k=1)
+        return matches[0] if matches else (None, 0.0)
+
+    def best_match(self, word):
+        return self.resolve(word)[0]
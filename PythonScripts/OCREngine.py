@@ -0,0 +1,159 @@
+import shlex
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+import pytesseract
+
+TESSERACT_DIR = r'C:\Program Files\Tesseract-OCR'
+pytesseract.pytesseract.tesseract_cmd = TESSERACT_DIR + r'\tesseract.exe'
+
+
+def parse_tesseract_config(config):
+    """
+    Split a tesseract command line config into (psm, oem, variables).
+    Uses shlex like pytesseract does, so both engines see exactly the same settings.
+    """
+    psm, oem, variables = None, None, {}
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        if args[i] == '--psm':
+            psm = int(args[i + 1])
+            i += 1
+        elif args[i] == '--oem':
+            oem = int(args[i + 1])
+            i += 1
+        elif args[i] == '-c':
+            name, _, value = args[i + 1].partition('=')
+            variables[name] = value
+            i += 1
+        i += 1
+    return psm, oem, variables
+
+
+class OCREngine:
+    """Interface of the text recognizers used for the Pokémon name"""
+
+    def __init__(self, config):
+        self.config = config
+
+    def read(self, image):
+        """Return the raw text found in a preprocessed (single channel) image"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the engine resources"""
+
+
+class PytesseractEngine(OCREngine):
+    """Runs tesseract.exe through pytesseract, a new process (and temp file) per read"""
+
+    def read(self, image):
+        return pytesseract.image_to_string(image, config=self.config)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps one Tesseract instance loaded in process (via tesserocr) and feeds it image buffers.
+    The model is loaded once, so a read only costs the recognition itself.
+    """
+
+    def __init__(self, config, tessdata_path=TESSERACT_DIR + r'\tessdata', lang='eng'):
+        super().__init__(config)
+        import tesserocr
+
+        psm, oem, variables = parse_tesseract_config(config)
+        self.api = tesserocr.PyTessBaseAPI(
+            path=tessdata_path,
+            lang=lang,
+            psm=psm if psm is not None else tesserocr.PSM.AUTO,
+            oem=oem if oem is not None else tesserocr.OEM.DEFAULT
+        )
+        for name, value in variables.items():
+            self.api.SetVariable(name, value)
+
+        self.lock = threading.Lock()  # The API object is not thread safe
+
+    def read(self, image):
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        with self.lock:
+            self.api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+            return self.api.GetUTF8Text()
+
+    def close(self):
+        self.api.End()
+
+
+def create_ocr_engine(name, config, quiet=False):
+    """Build the OCR engine selected in the config, 'auto' prefers the persistent one when available"""
+    if name in ('auto', 'tesserocr'):
+        try:
+            return TesserocrEngine(config)
+        except Exception as e:  # Missing package or tessdata
+            if name == 'tesserocr':
+                raise
+            if not quiet:
+                print(f"tesserocr unavailable ({e}): every name read starts tesseract.exe through pytesseract, "
+                      f"which is slower. Install it with 'pip install tesserocr' to keep Tesseract loaded")
+
+    if name in ('auto', 'pytesseract'):
+        return PytesseractEngine(config)
+    raise ValueError(f"Unknown OCR engine: {name}")
+
+
+# Engine of a pool worker process, created once by the pool initializer
+_worker_engine = None
+
+
+def _init_worker(name, config):
+    global _worker_engine
+    _worker_engine = create_ocr_engine(name, config, quiet=True)  # The parent reports the engine once
+
+
+def _worker_engine_name():
+    return type(_worker_engine).__name__
+
+
+def _worker_read(image):
+    try:
+        return _worker_engine.read(image)
+    except Exception as e:
+        # Some engine errors can't be rebuilt in the parent process, which would break the whole pool
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+class OCRPool:
+    """
+    OCR reads in worker processes, each keeping its own engine, so a slow Tesseract call never
+    holds the GIL the detector and the input need. submit() returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, name, config, workers=2):
+        self.name = name
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(name, config))
+
+    def warm_up(self, timeout=30.0):
+        """Start every worker and run a first read, so the first encounter doesn't pay for loading Tesseract"""
+        blank = np.full((32, 128), 255, dtype=np.uint8)
+        futures = [self.executor.submit(_worker_read, blank) for _ in range(self.workers)]
+        done, not_done = wait(futures, timeout)
+        errors = [f.exception() for f in done if f.exception() is not None]
+        if errors or not_done:
+            print(f"OCR warm-up incomplete: {errors[0] if errors else 'timed out'}")
+            return False
+
+        if self.name == 'auto' and self.executor.submit(_worker_engine_name).result(timeout) != TesserocrEngine.__name__:
+            print("tesserocr unavailable in the OCR workers: every name read starts tesseract.exe through pytesseract, "
+                  "which is slower. Install it with 'pip install tesserocr' to keep Tesseract loaded")
+        return True
+
+    def submit(self, image):
+        return self.executor.submit(_worker_read, image)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,44 +1,99 @@
-import pytesseract
 import cv2
 import numpy as np
-import pyautogui
 import re
-from difflib import get_close_matches
+import threading
+from collections import namedtuple
+from CaptureBackend import create_backend
+from TemplateLocator import TemplateLocator
+from TemplateBank import TemplateBank
+from ActionSignature import ActionSignature
+from OCREngine import create_ocr_engine
+from NameCache import NameCache
+from NameResolver import NameResolver
+from GlyphRecognizer import GlyphRecognizer
+from Metrics import METRICS
 
 import sys
 import os
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+# Result of a name read: confidence is the similarity of the read text to the matched name,
+# source tells which reader produced it ('cache', 'glyphs' or 'ocr')
+NameRead = namedtuple('NameRead', ['name', 'confidence', 'source'])
+
 
 class PokemonElementsOCR:
+    OCR_CONFIG = r'--psm 7 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz- '
+
     def __init__(self, names_file,
                  shiny_template_path=None,
                  battle_template_path=None,
                  gray_icon_path=None,
-                 red_icon_path=None):
+                 red_icon_path=None,
+                 capture_backend=None,
+                 ocr_engine='auto',
+                 name_cache=None,
+                 glyph_recognizer=None,
+                 glyph_min_confidence=0.9,
+                 template_bank=None,
+                 pyramid_levels=2):
 
+        self.capture_backend = capture_backend if capture_backend is not None else create_backend()
         self.known_pokemon = self._load_pokemon_names(names_file) if names_file else None
+        self.name_resolver = NameResolver.shared(self.known_pokemon) if self.known_pokemon else None
         self.shiny_template = self._load_template(shiny_template_path) if shiny_template_path else None
         self.battle_template = self._load_template(battle_template_path) if battle_template_path else None
         self.gray_action_template = self._load_template(gray_icon_path, 1) if gray_icon_path else None
         self.red_action_template = self._load_template(red_icon_path, 1) if red_icon_path else None
 
-        self.ocr_config = r'--psm 7 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz- '
+        self.pyramid_levels = pyramid_levels  # Coarse pass of the full screen searches
 
+        # Scaled copies of every template, for resolutions and UI scales other than the captured one
+        self.template_bank = template_bank if template_bank is not None else TemplateBank()
+
+        # Remember where each template matched so later searches only cover a small window
+        self.shiny_locator = self._create_locator('shiny', self.shiny_template)
+        self.battle_locator = self._create_locator('battle', self.battle_template)
+        self.gray_action_locator = self._create_locator('gray_action', self.gray_action_template)
+        self.red_action_locator = self._create_locator('red_action', self.red_action_template)
+        self.action_signature = None  # Built from the action icons at the session scale
+
+        self.ocr_config = self.OCR_CONFIG
+        self.ocr_engine_name = ocr_engine
+        self._ocr_engine = None  # Loaded on first in process read, the OCR workers usually do them
+        self._ocr_engine_lock = threading.Lock()
+        self.name_cache = name_cache if name_cache is not None else NameCache()
+        self.glyph_recognizer = glyph_recognizer if glyph_recognizer is not None else GlyphRecognizer()
+        self.glyph_min_confidence = glyph_min_confidence
 
-    @classmethod
-    def from_names_only(cls, config_handler):
-        """Factory method for names-only initialization"""
-        return cls(names_file=config_handler.get("Files", "names_file"))
+
+    @property
+    def ocr_engine(self):
+        """In process OCR engine, created when first needed"""
+        with self._ocr_engine_lock:
+            if self._ocr_engine is None:
+                self._ocr_engine = create_ocr_engine(self.ocr_engine_name, self.ocr_config)
+            return self._ocr_engine
 
     @classmethod
-    def from_config_handler(cls, config_handler):
-        """Factory method for full initialization from config"""
+    def from_config_handler(cls, config_handler, capture_backend=None):
+        """Factory method for full initialization from config, optionally on a capture backend shared with other clients"""
+        if capture_backend is None:
+            capture_backend = create_backend(config_handler.get("Advanced", "capture_backend"),
+                                             config_handler.get("Advanced", "replay_source"))
         return cls(
             names_file=config_handler.get("Files", "names_file"),
             shiny_template_path=config_handler.get("Files", "shiny_template"),
             battle_template_path=config_handler.get("Files", "battle_template"),
             gray_icon_path=config_handler.get("Files", "gray_action_icon"),
-            red_icon_path=config_handler.get("Files", "red_action_icon")
+            red_icon_path=config_handler.get("Files", "red_action_icon"),
+            capture_backend=capture_backend,
+            ocr_engine=config_handler.get("OCR", "ocr_engine"),
+            name_cache=NameCache(config_handler.get("OCR", "name_cache_size"),
+                                 config_handler.get("OCR", "name_cache_distance")),
+            glyph_recognizer=GlyphRecognizer(config_handler.get("Files", "glyph_atlas")),
+            glyph_min_confidence=config_handler.get("OCR", "glyph_min_confidence"),
+            template_bank=TemplateBank(config_handler.get("Files", "template_scale_cache")),
+            pyramid_levels=config_handler.get("Advanced", "pyramid_levels")
         )
 
     @staticmethod
@@ -51,50 +106,114 @@ class PokemonElementsOCR:
             print("Warning: pokemon_names.txt not found. Using fallback list.")
 
     @staticmethod
-    def _preprocess_image(image):
-        """Enhance image for better OCR results"""
+    def _threshold_image(image):
+        """Binarize the name crop, what the glyph atlas reads"""
         # Convert to grayscale
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
         # Apply thresholding
         _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return thresh
 
+    @staticmethod
+    def _thicken(thresh):
+        """Enhance a binarized crop for better OCR results"""
         # Apply dilation to make text thicker
         kernel = np.ones((2, 2), np.uint8)
-        processed = cv2.dilate(thresh, kernel, iterations=1)
+        return cv2.dilate(thresh, kernel, iterations=1)
 
-        return processed
+    @classmethod
+    def _preprocess_image(cls, image):
+        """Enhance image for better OCR results"""
+        return cls._thicken(cls._threshold_image(image))
 
-    def _clean_name(self, text):
-        """Clean and validate the OCR result"""
+    def _resolve_name(self, text):
+        """Clean and validate the OCR result, returns (name, match score)"""
         # Remove non-alphabetic characters except hyphen
-        cleaned = re.sub(r'[^a-zA-Z\- ]', '', text).strip()
+        with METRICS.timer('clean_name'):
+            cleaned = re.sub(r'[^a-zA-Z\- ]', '', text).strip()
 
-        # Find closest match in known Pokémon names
-        matches = get_close_matches(cleaned.lower(), self.known_pokemon, n=1, cutoff=0.6)
-        return matches[0].title() if matches else None
+            # Find closest match in known Pokémon names
+            match, score = self.name_resolver.resolve(cleaned.lower())
+        return (match.title(), score) if match else (None, 0.0)
 
-    def detect_pokemon_name(self, name_region):
-        """Capture screen and detect Pokémon name"""
-        try:
-            # Capture name area
-            screenshot = pyautogui.screenshot(region=name_region)
-            img = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+    def capture_frame(self):
+        """Take the one full screen capture that every detector of a tick shares"""
+        with METRICS.timer('capture'):
+            return self.capture_backend.grab()
 
-            # Preprocess image
-            processed = self._preprocess_image(img)
+    def detect_pokemon_name(self, name_region, frame=None):
+        """Capture screen (or reuse a frame) and detect Pokémon name"""
+        return self.read_pokemon_name(name_region, frame).name
 
-            # Try OCR
-            text = pytesseract.image_to_string(processed, config=self.ocr_config)
+    def read_pokemon_name(self, name_region, frame=None):
+        """Capture screen (or reuse a frame) and read the Pokémon name, returns a NameRead"""
+        try:
+            processed, thresh, crop_hash, read = self.prepare_name_read(name_region, frame)
+            if read is not None:
+                return read
 
-            # Clean and validate
-            if text.strip():
-                return self._clean_name(text)
-            return None
+            with METRICS.timer('tesseract'):
+                text = self.ocr_engine.read(processed)
+            return self.finish_name_read(thresh, crop_hash, text)
 
         except Exception as e:
             print(f"Detection error: {e}")
-            return None
+            return NameRead(None, 0.0, None)
+
+    def prepare_name_read(self, name_region, frame=None):
+        """
+        Everything of a name read but the OCR: capture, preprocessing, name cache and glyph atlas
+        Returns: (processed image for the OCR, binarized crop for the atlas, crop hash, NameRead)
+        where the NameRead is None while the OCR is still needed
+        """
+        # Capture name area
+        if frame is not None:
+            img = frame.crop(name_region).bgr
+        else:
+            with METRICS.timer('capture_region'):
+                img = self.capture_backend.grab(region=name_region).bgr
+
+        # Preprocess image
+        with METRICS.timer('preprocess'):
+            thresh = self._threshold_image(img)
+            processed = self._thicken(thresh)
+
+        # Same looking crop as a recent encounter, skip the OCR
+        crop_hash = NameCache.image_hash(processed)
+        found, cached = self.name_cache.get(crop_hash)
+        if found:
+            return processed, thresh, crop_hash, cached._replace(source='cache')
+
+        # The game font is fixed, try the glyph atlas first
+        if self.glyph_recognizer.ready:
+            with METRICS.timer('glyphs'):
+                text, confidence = self.glyph_recognizer.recognize(thresh)
+            if confidence >= self.glyph_min_confidence:
+                read = NameRead(*self._resolve_name(text), 'glyphs')
+                if read.name:
+                    self.name_cache.put(crop_hash, read)
+                    return processed, thresh, crop_hash, read
+
+        return processed, thresh, crop_hash, None
+
+    def finish_name_read(self, thresh, crop_hash, text):
+        """Clean and validate the OCR text of a prepared read, and let the atlas learn from exact reads"""
+        read = NameRead(*self._resolve_name(text), 'ocr') if text.strip() else NameRead(None, 0.0, 'ocr')
+        if read.name:
+            # A fuzzy match isn't what is on screen (Latlos -> Latios), it would teach the atlas a wrong glyph
+            if read.confidence == 1.0:
+                self.glyph_recognizer.learn(thresh, read.name)
+            self.name_cache.put(crop_hash, read)
+        return read
+
+    def learn_name_glyphs(self, name_region, label):
+        """Teach the glyph atlas the name currently shown in the name region"""
+        img = self.capture_backend.grab(region=name_region).bgr
+        learned = self.glyph_recognizer.learn(self._threshold_image(img), label)
+        if learned:
+            self.glyph_recognizer.save()
+        return learned
 
     @staticmethod
     def _load_template(image_path, color_mode = 0):
@@ -108,19 +227,99 @@ class PokemonElementsOCR:
             print(f"Error loading template image: {e}")
             sys.exit(1)
 
-    def is_shiny_present(self):
-        """Check if the shiny message is on screen"""
-        screenshot = pyautogui.screenshot()
-        screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
+    def _create_locator(self, name, template):
+        if template is None:
+            return None
+        # The shiny message shows for a few frames only, never reuse a stale verdict for it
+        return TemplateLocator(self.template_bank.add(name, template), name=name, pyramid_levels=self.pyramid_levels,
+                               gated=name != 'shiny')
+
+    def _locators(self):
+        return {
+            'shiny': self.shiny_locator,
+            'battle': self.battle_locator,
+            'gray_action': self.gray_action_locator,
+            'red_action': self.red_action_locator
+        }
+
+    def _locate(self, name, frame, threshold=0.8):
+        """
+        Locate a template at the session scale, or at one candidate scale while it isn't known yet
+        The first battle template match fixes the scale of every template: the small templates
+        (action icons, shiny message) can reach the threshold at a wrong scale.
+        """
+        locator = self._locators()[name]
+        if self.template_bank.confirmed:
+            return locator.locate(frame, threshold)
+
+        scale = self.template_bank.next_candidate(name)
+        locator.set_template(self.template_bank.get(name, scale))
+        score, loc = locator.locate(frame, threshold)
+        if score >= threshold and name == 'battle':
+            self._confirm_scale(scale)
+        return score, loc
+
+    def _confirm_scale(self, scale):
+        """Switch every locator to the scale a template just matched at"""
+        self.template_bank.confirm(scale)
+        for name, locator in self._locators().items():
+            if locator is not None:
+                locator.set_template(self.template_bank.get(name))
+
+    def find_battle_anchor(self, frame=None, threshold=0.8):
+        """
+        Top left corner of the battle template, trying every template scale while the session one is unknown
+        Returns: (x, y) in screen coordinates, or None when no battle is on screen
+        """
+        if frame is None:
+            frame = self.capture_frame()
+
+        scales = [self.template_bank.scale] if self.template_bank.confirmed else self.template_bank.scales
+        for scale in scales:
+            self.battle_locator.set_template(self.template_bank.get('battle', scale))
+            self.battle_locator.forget()
+            score, loc = self.battle_locator.locate(frame, threshold)
+            if score >= threshold:
+                self._confirm_scale(scale)
+                return loc
+        return None
+
+    def anchored_region(self, offset):
+        """
+        Screen region at an offset (dx, dy, width, height) from the last battle template match
+        Returns: (x, y, width, height), or None until the battle template was found
+        """
+        anchor = self.battle_locator.location if self.battle_locator is not None else None
+        if anchor is None:
+            return None
+        dx, dy, w, h = offset
+        return anchor[0] + dx, anchor[1] + dy, w, h
+
+    def match_stats(self):
+        """Template search counters of every locator"""
+        locators = self._locators()
+        return {
+            name: {
+                'full_searches': locator.full_searches,
+                'window_searches': locator.window_searches,
+                'skipped_matches': locator.skipped_matches
+            }
+            for name, locator in locators.items() if locator is not None
+        }
+
+    def is_shiny_present(self, frame=None, threshold=0.8, region=None):
+        """Check if the shiny message is on screen, or only in the battle message region (x, y, width, height)"""
+        if frame is None:
+            frame = self.capture_frame()
+        if region:
+            frame = frame.crop(region)
 
         # Template matching
-        res = cv2.matchTemplate(screenshot, self.shiny_template, cv2.TM_CCOEFF_NORMED)
-        threshold = 0.8
-        loc = np.where(res >= threshold)
+        max_val, _ = self._locate('shiny', frame, threshold)
 
-        return len(loc[0]) > 0
+        return max_val >= threshold
 
-    def is_in_battle(self, threshold=0.8):
+    def is_in_battle(self, threshold=0.8, frame=None):
         """Check if player is in battle"""
         try:
             # Load the battle template image
@@ -128,12 +327,11 @@ class PokemonElementsOCR:
                 raise FileNotFoundError(f"Battle template image not found at {os.path.abspath(os.path.dirname(__file__))}")
 
             # Take screenshot of the game window
-            screenshot = pyautogui.screenshot()
-            screenshot_gray = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
+            if frame is None:
+                frame = self.capture_frame()
 
             # Perform template matching
-            res = cv2.matchTemplate(screenshot_gray, self.battle_template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, _ = cv2.minMaxLoc(res)
+            max_val, _ = self._locate('battle', frame, threshold)
 
             # Return True if the match confidence exceeds the threshold
             return max_val >= threshold
@@ -142,21 +340,39 @@ class PokemonElementsOCR:
             print(f"Error in battle detection: {e}")
             return False
 
-    def is_action_ready(self):
+    def _action_signature(self):
+        """Signature of the action icons as currently matched (rebuilt if the template scale changed)"""
+        templates = (self.gray_action_locator.template, self.red_action_locator.template)
+        if self.action_signature is None or any(a is not b for a, b in zip(self.action_signature.templates, templates)):
+            self.action_signature = ActionSignature(*templates)
+        return self.action_signature
+
+    def is_action_ready(self, frame=None):
         """
-        Check which template matches better: red (busy) or gray (ready)
+        Check whether the action icon is gray (ready) or red (busy), by its pixel colors at the
+        learned location, else by which template matches better
         Returns: True if ready (gray), False if busy (red)
         """
         # Capture current screen
-        screenshot = pyautogui.screenshot()
-        img = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+        if frame is None:
+            frame = self.capture_frame()
+
+        # Once the icon was found, its colors are enough to tell the two states apart
+        location = self.gray_action_locator.location or self.red_action_locator.location
+        if location is not None and self.template_bank.confirmed:
+            with METRICS.timer('action_signature'):
+                ready = self._action_signature().classify(frame, location)
+            if ready is not None:
+                return ready
 
-        # Match against both templates
-        red_match = cv2.matchTemplate(img, self.red_action_template, cv2.TM_CCOEFF_NORMED)
-        gray_match = cv2.matchTemplate(img, self.gray_action_template, cv2.TM_CCOEFF_NORMED)
+        # Both icons are drawn at the same spot, let one locator teach the other
+        if self.red_action_locator.location is None:
+            self.red_action_locator.location = self.gray_action_locator.location
+        if self.gray_action_locator.location is None:
+            self.gray_action_locator.location = self.red_action_locator.location
 
-        # Get best match values
-        _, red_val, _, _ = cv2.minMaxLoc(red_match)
-        _, gray_val, _, _ = cv2.minMaxLoc(gray_match)
+        # Match against both templates, get best match values
+        red_val, _ = self._locate('red_action', frame)
+        gray_val, _ = self._locate('gray_action', frame)
         # Return state based on which matches better
         return gray_val > red_val
\ No newline at end of file
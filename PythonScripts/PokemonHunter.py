@@ -1,3 +1,5 @@
+import argparse
+import asyncio
 import time
 import keyboard
 import random
@@ -5,20 +7,48 @@ import os
 from ConfigHandler import ConfigHandler
 import json
 import csv
-from datetime import datetime
+from datetime import datetime, timedelta
 import winsound
-from collections import defaultdict
-from PokemonElementsOCR import PokemonElementsOCR
+from PokemonElementsOCR import PokemonElementsOCR, NameRead
+from OCREngine import OCRPool
+from CaptureBackend import ReplayFinished, SharedCapture, WindowCapture, create_backend
+from GameStateDetector import GameStateDetector, GameEvent
+from ScanScheduler import ScanScheduler
+from EncounterLog import EncounterLog
+from EncounterStore import EncounterStore
+from EncounterStats import RollingStats
+from Metrics import METRICS, serve_metrics
+from InputDispatcher import InputDispatcher
+from Profiler import Profiler
 
 
 class ShinyCatcher:
-    def __init__(self, config_path="CONFIG.ini"):
+    def __init__(self, config_path="CONFIG.ini", profiler=None,
+                 shared_capture=None, ocr_pool=None, input_dispatcher=None, save_path='EncounterLogs'):
+        # Started first so the allocations of the set up are traced too
+        self.profiler = profiler.start() if profiler is not None else None
         self.configHandler = ConfigHandler(config_path)
-        self.encounterCounter = EncounterCounter()
-        self.elementsOCR = PokemonElementsOCR.from_config_handler(self.configHandler)
+        self.encounterCounter = EncounterCounter(save_path, shiny_odds=self.configHandler.get("Other", "shiny_odds"))
+
+        # Game window of this client, None when the game fills the screen
+        self.window = self.configHandler.get("Advanced", "window_region") or None
+        capture_backend = None
+        if shared_capture is not None:
+            capture_backend = WindowCapture(shared_capture, self.window) if self.window else shared_capture
+        self.elementsOCR = PokemonElementsOCR.from_config_handler(self.configHandler, capture_backend)
+
+        # With several clients the keyboard and the OCR workers are shared, run by MultiClientHunter
+        self.standalone = input_dispatcher is None
+        self.input = input_dispatcher if input_dispatcher is not None else InputDispatcher()
+        if ocr_pool is None and self.standalone:
+            ocr_pool = OCRPool(self.configHandler.get("OCR", "ocr_engine"), self.elementsOCR.ocr_config,
+                               self.configHandler.get("Advanced", "ocr_workers"))
+            ocr_pool.warm_up()
+        self.ocr_pool = ocr_pool
+        self.scanScheduler = ScanScheduler(self.configHandler.get("Advanced", "scan_interval"),
+                                           self.configHandler.get("Advanced", "cpu_budget"))
 
         self.current_direction = self._load_starting_direction()
-        self.next_switch_time = 0
         self.next_afk_time = time.time() + self._get_random_afk_interval()
 
 
@@ -29,12 +59,13 @@ class ShinyCatcher:
         else:
             return "d"
 
-    @staticmethod
-    def _press_key(key, delay=0.1):
-        """Helper: Press and release key with delay"""
-        keyboard.press(key)
-        time.sleep(delay)
-        keyboard.release(key)
+    async def _send_key(self, action, key):
+        """Queue a key command ("tap", "press" or "release") for this client's window and wait until it was sent"""
+        await self.input.send(action, key, self.window)
+
+    async def _press_key(self, key):
+        """Helper: Press and release key"""
+        await self._send_key("tap", key)
 
     def _get_random_afk_interval(self):
         """Calculate random AFK interval"""
@@ -52,6 +83,30 @@ class ShinyCatcher:
         self.encounterCounter.display_stats()
         self.encounterCounter.save_to_json()
         self.encounterCounter.save_to_csv()
+        self.encounterCounter.close()
+
+        self.elementsOCR.glyph_recognizer.save()
+        if self.standalone and self.ocr_pool is not None:
+            self.ocr_pool.close()
+
+        cache_stats = self.elementsOCR.name_cache.stats()
+        print(f"Name cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate)")
+
+        scan_stats = self.scanScheduler.stats()
+        print(f"Detector: {scan_stats['tick_rate']:.1f} scans/s, {scan_stats['mean_work_time'] * 1000:.1f} ms per scan, "
+              f"{scan_stats['cpu_share']:.0%} busy, ~{scan_stats['mean_reaction_latency'] * 1000:.0f} ms reaction latency")
+
+        for name, stats in self.elementsOCR.match_stats().items():
+            print(f"{name} template: {stats['full_searches']} full searches, {stats['window_searches']} window searches, "
+                  f"{stats['skipped_matches']} matches skipped on unchanged frames")
+
+        # The registry is process wide, with several clients it is reported once for all of them
+        if self.standalone:
+            report_metrics(self.encounterCounter.save_path, self.encounterCounter.start_time)
+
+        if self.profiler is not None:
+            self.profiler.report()
 
     @staticmethod
     def _play_sound(sound_file):
@@ -61,162 +116,443 @@ class ShinyCatcher:
         except Exception as e:
             print(f"Sound error: {e}")
 
-    def _catch_pokemon(self):
+    async def _catch_pokemon(self):
         """Catches Pokemons according to the configs"""
-        sync_enabled = self.configHandler.get("AutoCatch","sync_enabled")
-        fs_enabled = self.configHandler.get("AutoCatch", "fs_enabled")
-        fs_pokemon_position = self.configHandler.get("AutoCatch", "fs_pokemon_position")
-        fs_move_position =  self.configHandler.get("AutoCatch", "fs_move_position")
-        ball_to_use = self.configHandler.get("AutoCatch", "ball_to_use")
+        autocatch = self.configHandler.snapshot.AutoCatch
+        sync_enabled = autocatch.sync_enabled
+        fs_enabled = autocatch.fs_enabled
+        fs_pokemon_position = autocatch.fs_pokemon_position
+        fs_move_position = autocatch.fs_move_position
+        ball_to_use = autocatch.ball_to_use
 
         # False swipe (if enabled)
         if fs_enabled:
             # Switch to FS pokemon if needed
             if sync_enabled or fs_pokemon_position != 1:
-                if self._wait_until_action_ready():
-                    time.sleep(1)
-                    self._press_key("2") #Open switch menu
-                    time.sleep(0.5)
-                    self._press_key(fs_pokemon_position)
+                if await self._wait_until_action_ready():
+                    await asyncio.sleep(1)
+                    await self._press_key("2") #Open switch menu
+                    await asyncio.sleep(0.5)
+                    await self._press_key(fs_pokemon_position)
 
             # Use False Swipe
-            time.sleep(1)
-            if self._wait_until_action_ready():
-                time.sleep(0.1)
-                self._press_key("1")  # Open attack menu
-                time.sleep(0.5)
-                self._press_key(fs_move_position)
+            await asyncio.sleep(1)
+            if await self._wait_until_action_ready():
+                await asyncio.sleep(0.1)
+                await self._press_key("1")  # Open attack menu
+                await asyncio.sleep(0.5)
+                await self._press_key(fs_move_position)
 
         # Always throw ball
-        while self.elementsOCR.is_in_battle():
-            if self._wait_until_action_ready():
-                time.sleep(0.1)
-                self._press_key("3")
-                time.sleep(0.5)
-                self._press_key(ball_to_use)
+        while self.battle_active.is_set():
+            if await self._wait_until_action_ready():
+                await asyncio.sleep(0.1)
+                await self._press_key("3")
+                await asyncio.sleep(0.5)
+                await self._press_key(ball_to_use)
+
+    async def _wait_until_action_ready(self, timeout=10):
+        """Wait until the detector reports the action icon as ready, or timeout"""
+        try:
+            await asyncio.wait_for(self.action_ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _pause_movement(self, reason):
+        self.pause_reasons.add(reason)
+        self.can_move.clear()
+        self.movement_paused.set()
+
+    def _resume_movement(self, reason):
+        self.pause_reasons.discard(reason)
+        if not self.pause_reasons:
+            self.movement_paused.clear()
+            self.can_move.set()
+
+    async def _event_task(self):
+        """Apply the state transitions published by the detector thread, returns when a shiny shows up"""
+        while True:
+            event = await self.events.get()
+
+            if event.type == GameEvent.SHINY_SEEN:
+                config = self.configHandler.snapshot
+                if config.Other.play_wanted_sound:
+                    await asyncio.to_thread(self._play_sound, config.Files.shiny_sound)
+                print("SHINY FOUND! Stopping script.")
+                return
+
+            elif event.type == GameEvent.BATTLE_STARTED:
+                self.battle_start_time = event.timestamp
+                self._pause_movement("battle")
+                self.battle_active.set()
+                self.battle_started.set()
+
+            elif event.type == GameEvent.BATTLE_ENDED:
+                self.battle_active.clear()
+                self.action_ready.clear()
+
+            elif event.type == GameEvent.ACTION_READY:
+                self.action_ready.set()
+
+            elif event.type == GameEvent.ACTION_BUSY:
+                self.action_ready.clear()
+
+            elif event.type == GameEvent.DETECTOR_STOPPED:
+                raise event.error
+
+    async def _battle_task(self):
+        """Handle every battle reported by the detector"""
+        while True:
+            await self.battle_started.wait()
+            self.battle_started.clear()
+
+            config = self.configHandler.snapshot
+            # Neither running nor catching can start before the battle menu shows up, wait for it during the read
+            name_read, _ = await asyncio.gather(self._read_name(self._name_region(config.OCR), config.OCR.ocr_timeout),
+                                                self._wait_until_action_ready(config.OCR.ocr_timeout))
+            pokemon_name = name_read.name
+            if pokemon_name and pokemon_name.lower() in config.OCR.wanted_pokemon:
+                if config.Other.play_wanted_sound:
+                    await asyncio.to_thread(self._play_sound, config.Files.wanted_sound)
+                await self._catch_pokemon()
+
+            #Run
+            else:
+                while self.battle_active.is_set():
+                    await self._press_key("4")
+                    await asyncio.sleep(0.5)
+
+            self.encounterCounter.record_encounter(pokemon_name, confidence=name_read.confidence,
+                                                   battle_duration=time.time() - self.battle_start_time)
+            self._resume_movement("battle")
+
+    def _name_region(self, ocr):
+        """Name crop of this battle: at its offset from the battle screen when calibrated that way, else the fixed region"""
+        if ocr.name_offset:
+            region = self.elementsOCR.anchored_region(ocr.name_offset)
+            if region is not None:
+                return region
+        return ocr.name_region
+
+    async def _read_name(self, name_region, timeout):
+        """
+        Read the name with the OCR running in the worker processes, the loop keeps handling
+        input and detector events meanwhile. A read that times out counts as an unknown Pokémon,
+        and the OCR runs in this process when the pool is unusable.
+        """
+        if self.ocr_pool is None:
+            return await asyncio.to_thread(self.elementsOCR.read_pokemon_name, name_region)
+
+        try:
+            processed, thresh, crop_hash, read = await asyncio.to_thread(self.elementsOCR.prepare_name_read, name_region)
+        except Exception as e:
+            print(f"Detection error: {e}")
+            return NameRead(None, 0.0, None)
+        if read is not None:
+            return read
 
-    def _wait_until_action_ready(self,timeout=10, check_interval=0.2):
-        """Wait until icon is ready or timeout"""
-        start_time = time.time()
+        start = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(asyncio.wrap_future(self.ocr_pool.submit(processed)), timeout)
+        except asyncio.TimeoutError:
+            print(f"Name read timed out after {timeout:.1f}s")
+            return NameRead(None, 0.0, 'timeout')
+        except Exception as e:  # A worker died or the engine failed
+            print(f"OCR worker error: {e}, reading in process")
+            try:
+                text = await asyncio.to_thread(self.elementsOCR.ocr_engine.read, processed)
+            except Exception as e:
+                print(f"Detection error: {e}")
+                return NameRead(None, 0.0, None)
+        METRICS.observe('tesseract', time.perf_counter() - start)
+        return self.elementsOCR.finish_name_read(thresh, crop_hash, text)
 
-        while time.time() - start_time < timeout:
-            if self.elementsOCR.is_action_ready():
-                return True
-            time.sleep(check_interval)
+    @staticmethod
+    def _move_time_range(movement):
+        """Min and max time to walk in one direction, from the Movement settings"""
+        base_move_time = movement.ntiles / movement.movement_speed
+        min_move_time = max(movement.min_move_time, base_move_time * 0.5)
+        max_move_time = base_move_time * 0.8
+        return min_move_time, max_move_time
+
+    async def _movement_task(self):
+        """Walk from side to side, holding the direction key until the next switch or a pause"""
+        while True:
+            await self.can_move.wait()
+            config = self.configHandler.snapshot  # Re-read every walk so config edits apply mid-session
+            min_move_time, max_move_time = self._move_time_range(config.Movement)
+
+            direction = self.current_direction
+            await self._send_key("press", direction)
+            try:
+                await asyncio.wait_for(self.movement_paused.wait(),
+                                       timeout=random.uniform(min_move_time, max_move_time))
+                # Paused by a battle or AFK, walk the same way again afterwards
+                await self._send_key("release", direction)
+            except asyncio.TimeoutError:
+                await self._send_key("release", direction)
+                self.current_direction = 'd' if direction == 'a' else 'a'
+
+                # Turning around is when encounters tend to start, watch closely
+                self.scanScheduler.boost()
+                await asyncio.sleep(config.Advanced.move_delay)
+
+    async def _afk_task(self):
+        """Take randomized AFK breaks"""
+        while True:
+            await asyncio.sleep(max(0.0, self.next_afk_time - time.time()))
+
+            movement = self.configHandler.snapshot.Movement
+            afk_interval = movement.afk_interval
+            afk_duration = movement.afk_duration
+            afk_randomness = movement.afk_randomness
+
+            # Calculate random AFK duration (exponential distribution)
+            afk_time = min(afk_duration* 2,
+                           random.expovariate(1 / (afk_duration * (1 - afk_randomness))))
+
+            # Only between battles: idle scans would be too slow to see a battle end, and keys would outlive it
+            while self.battle_active.is_set() or "battle" in self.pause_reasons:
+                await asyncio.sleep(0.5)
+
+            print(f"\n--- Going AFK for {afk_time / 60:.1f} minutes ---")
+            self._pause_movement("afk")
+            self.scanScheduler.set_idle(True)
+            await asyncio.sleep(afk_time)
+            self.scanScheduler.set_idle(False)
+            print("--- Returning from AFK ---\n")
+
+            # Reset next AFK time with randomness
+            self.next_afk_time = time.time() + random.normalvariate(
+                afk_interval, afk_interval * afk_randomness)
+
+            # Reset movement
+            self.current_direction = 'a'
+            self._resume_movement("afk")
+
+    async def _profile_task(self, interval=1.0):
+        """Profile the event loop thread too: battles, name reads, input and encounter logging all run on it"""
+        try:
+            while True:
+                self.profiler.tick('hunter')
+                await asyncio.sleep(interval)
+        finally:
+            self.profiler.detach('hunter')
 
-        return False
+    async def run(self):
+        """Run every part of the bot as cooperating tasks, until a shiny is found or one of them fails"""
+        movement = self.configHandler.snapshot.Movement
 
+        print(f"Starting shiny hunter for {movement.ntiles} tiles...")
+        print(f"AFK settings: ~{movement.afk_interval / 60:.1f}min active, ~{movement.afk_duration / 60:.1f}min breaks")
+
+        self.next_afk_time = time.time() + self._get_random_afk_interval()
+
+        # Coordination state shared by the tasks
+        self.events = asyncio.Queue()
+        self.battle_started = asyncio.Event()
+        self.battle_active = asyncio.Event()
+        self.battle_start_time = time.time()
+        self.action_ready = asyncio.Event()
+        self.pause_reasons = set()
+        self.can_move = asyncio.Event()
+        self.can_move.set()
+        self.movement_paused = asyncio.Event()
+
+        # Detection runs on its own thread and hands its events over to the loop
+        loop = asyncio.get_running_loop()
+        detector = GameStateDetector(self.elementsOCR,
+                                     lambda event: loop.call_soon_threadsafe(self.events.put_nowait, event),
+                                     self.scanScheduler,
+                                     self.profiler,
+                                     self.configHandler)
+        detector.start()
+        self.configHandler.watch()
+
+        # Stage latencies for Prometheus, on localhost only
+        metrics_server = serve_metrics(self.configHandler.get("Advanced", "metrics_port")) if self.standalone else None
+
+        tasks = [
+            asyncio.create_task(self._event_task()),
+            asyncio.create_task(self._battle_task()),
+            asyncio.create_task(self._movement_task()),
+            asyncio.create_task(self._afk_task()),
+        ]
+        if self.standalone:
+            tasks.append(asyncio.create_task(self.input.run()))
+        if self.profiler is not None:
+            tasks.append(asyncio.create_task(self._profile_task()))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()  # Re-raise the error of a failed task
+        finally:
+            detector.stop()
+            detector.join(timeout=2.0)  # Let it finish its tick (and profiling period)
+            self.configHandler.stop_watching()
+            if metrics_server is not None:
+                metrics_server.stop()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     def main(self):
         """Main execution loop"""
-        ntiles = self.configHandler.get("Movement", "ntiles")
-        afk_interval = self.configHandler.get("Movement", "afk_interval")
-        afk_duration = self.configHandler.get("Movement", "afk_duration")
-        movement_speed = self.configHandler.get("Movement","movement_speed")
-        min_move_time = self.configHandler.get("Movement","min_move_time")
-        afk_randomness = self.configHandler.get("Movement","afk_randomness")
+        try:
+            asyncio.run(self.run())
 
-        print(f"Starting shiny hunter for {ntiles} tiles...")
-        print(f"AFK settings: ~{afk_interval / 60:.1f}min active, ~{afk_duration / 60:.1f}min breaks")
+        except KeyboardInterrupt:
+            print("\nScript stopped by user.")
+        except ReplayFinished as e:
+            print(f"\n{e}")
+        finally:
+            # Also after a shiny or a crash, so the session is never lost
+            self._cleanup()
 
-        # Movement configuration
-        base_move_time = ntiles / movement_speed
-        min_move_time = max(min_move_time, base_move_time * 0.5)
-        max_move_time = base_move_time * 0.8
 
-        self.next_afk_time = time.time() + self._get_random_afk_interval()
+class MultiClientHunter:
+    """
+    Hunts in several game windows from one process, one config file per client.
+    Every client keeps its own window, regions, movement and encounter counter, while the
+    desktop capture, the keyboard and the OCR workers are shared between them.
+    """
+
+    def __init__(self, config_paths, profiler=None):
+        first_config = ConfigHandler(config_paths[0]).snapshot  # Shared settings come from the first client
+        advanced = first_config.Advanced
+
+        # One capture serves every detector scanning within the same half interval
+        self.capture = SharedCapture(create_backend(advanced.capture_backend, advanced.replay_source),
+                                     max_age=advanced.scan_interval / 2)
+        self.ocr_pool = OCRPool(first_config.OCR.ocr_engine, PokemonElementsOCR.OCR_CONFIG, advanced.ocr_workers)
+        self.ocr_pool.warm_up()
+        self.input = InputDispatcher()
+        self.metrics_port = advanced.metrics_port
+
+        self.clients = []
+        for i, config_path in enumerate(config_paths):
+            client_name = os.path.splitext(os.path.basename(config_path))[0]
+            self.clients.append(ShinyCatcher(config_path, profiler if i == 0 else None,
+                                             self.capture, self.ocr_pool, self.input,
+                                             save_path=os.path.join('EncounterLogs', client_name)))
+
+    async def run(self):
+        """Run every client until one finds a shiny (the input would keep stealing its window) or fails"""
+        metrics_server = serve_metrics(self.metrics_port)
+        tasks = [asyncio.create_task(self.input.run())]
+        tasks += [asyncio.create_task(client.run()) for client in self.clients]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            if metrics_server is not None:
+                metrics_server.stop()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
+    def main(self):
         try:
-            while True:
-                current_time = time.time()
-
-                # AFK Check
-                if current_time >= self.next_afk_time:
-                    # Calculate random AFK duration (exponential distribution)
-                    afk_time = min(afk_duration* 2,
-                                   random.expovariate(1 / (afk_duration * (1 - afk_randomness))))
-
-                    print(f"\n--- Going AFK for {afk_time / 60:.1f} minutes ---")
-                    keyboard.release(self.current_direction)
-                    time.sleep(afk_time)
-                    print("--- Returning from AFK ---\n")
-
-                    # Reset next AFK time with randomness
-                    self.next_afk_time = time.time() + random.normalvariate(
-                        afk_interval, afk_interval * afk_randomness)
-
-                    # Reset movement
-                    self.current_direction = 'a'
-                    self.next_switch_time = time.time() + random.uniform(min_move_time, max_move_time)
-                    keyboard.press(self.current_direction)
-
-                # Shiny check
-                if self.elementsOCR.is_shiny_present():
-                    if self.configHandler.get("Other", "play_wanted_sound"):
-                        self._play_sound(self.configHandler.get("Files", "shiny_sound"))
-                    print("SHINY FOUND! Stopping script.")
-                    break
-
-                # Battle handling
-                if self.elementsOCR.is_in_battle():
-                    keyboard.release(self.current_direction)
-
-                    name_region = self.configHandler.get("OCR","name_region")
-                    pokemon_name = self.elementsOCR.detect_pokemon_name(name_region=name_region)
-                    self.encounterCounter.record_encounter(pokemon_name)
-                    if pokemon_name in self.configHandler.get("OCR", "wanted_pokemon"):
-                        if self.configHandler.get("Other", "play_wanted_sound"):
-                            self._play_sound(self.configHandler.get("Files", "wanted_sound"))
-                        self._catch_pokemon()
-
-                    #Run
-                    else:
-                        while self.elementsOCR.is_in_battle():
-                            self._press_key("4")
-                            time.sleep(0.5)
-
-                    self.next_switch_time = time.time() + random.uniform(min_move_time, max_move_time)
-                    keyboard.press(self.current_direction)
-
-                # Movement control
-                if current_time >= self.next_switch_time:
-                    keyboard.release(self.current_direction)
-                    self.current_direction = 'd' if self.current_direction == 'a' else 'a'
-                    move_duration = random.uniform(min_move_time, max_move_time)
-                    self.next_switch_time = current_time + move_duration
-                    keyboard.press(self.current_direction)
-
-                # Sleep between Checks
-                time.sleep(0.1)
+            asyncio.run(self.run())
 
         except KeyboardInterrupt:
-            self._cleanup()
             print("\nScript stopped by user.")
+        except ReplayFinished as e:
+            print(f"\n{e}")
+        finally:
+            for client in self.clients:
+                print(f"\n##### {client.configHandler.config_path} #####")
+                client._cleanup()
+            print()
+            report_metrics('EncounterLogs', self.clients[0].encounterCounter.start_time)
+            self.ocr_pool.close()
+            self.capture.close()
+            print(f"Shared capture: {self.capture.grabs} screen grabs for {self.capture.requests} frames "
+                  f"used by {len(self.clients)} clients")
 
 
 class EncounterCounter:
-    def __init__(self, save_path='EncounterLogs'):
-        self.encounters = defaultdict(int)  # {pokemon_name: count}
-        self.total_encounters = 0
-        self.start_time = datetime.now()
+    def __init__(self, save_path='EncounterLogs', start_time=None, journal=True, shiny_odds=8192):
+        self.start_time = start_time or datetime.now()
+        self.stats = RollingStats(shiny_odds=shiny_odds, start_time=self.start_time.timestamp())
+        self.end_time = None  # Only set for sessions rebuilt from a journal
         self.save_path = save_path
 
         # Create save directory if it doesn't exist
         os.makedirs(save_path, exist_ok=True)
 
-    def record_encounter(self, pokemon_name):
+        # Stream every encounter to disk as it happens, and into the cross session database
+        self.log = None
+        self.store = None
+        if journal:
+            self.log = EncounterLog(save_path)
+            self.store = EncounterStore(os.path.join(save_path, 'encounters.db'))
+            self._recover_unfinished_session()
+            self.log.open(self.start_time)
+            self.session_id = self.store.start_session(self.start_time)
+
+    def _recover_unfinished_session(self):
+        """Rebuild and save the session left behind by a run that never reached its cleanup"""
+        unfinished = self.log.read_unfinished()
+        if unfinished is None:
+            return
+
+        start_time, records = unfinished
+        previous = EncounterCounter(self.save_path, start_time=start_time, journal=False)
+        for record in records:
+            previous._add(record['name'], datetime.fromisoformat(record['time']).timestamp())
+        previous.end_time = datetime.fromisoformat(records[-1]['time']) if records else start_time
+
+        print(f"Recovered {previous.total_encounters} encounters from an unfinished session")
+        previous.save_to_json()
+        previous.save_to_csv()
+        self.store.replace_session(start_time, records, previous.end_time)
+        self.log.archive(start_time)
+
+    @property
+    def encounters(self):
+        """{pokemon_name: count}"""
+        return self.stats.counts
+
+    @property
+    def total_encounters(self):
+        return self.stats.total
+
+    def _add(self, pokemon_name, timestamp=None):
+        self.stats.add(pokemon_name, timestamp)
+
+    def record_encounter(self, pokemon_name, confidence=None, battle_duration=None):
         """Record a new Pokémon encounter"""
         if pokemon_name:  # Only record if we got a valid name
-            self.encounters[pokemon_name] += 1
-            self.total_encounters += 1
+            self._add(pokemon_name)
+            if self.log:
+                self.log.append(pokemon_name, confidence, battle_duration)
+                self.store.add_encounter(self.session_id, pokemon_name, confidence=confidence,
+                                         battle_duration=battle_duration)
             print(f"Encounter #{self.total_encounters}: {pokemon_name}")
 
+    def close(self):
+        """Finish the session journal and database writes"""
+        if self.log:
+            self.log.archive()
+            self.store.end_session(self.session_id)
+            self.store.close()
+
+    def live_summary(self, top=5):
+        """Current statistics, cheap enough to query at any moment"""
+        return self.stats.summary(top, now=self._session_end().timestamp())
+
+    def _session_end(self):
+        return self.end_time or datetime.now()
+
     def get_stats(self):
         """Get current encounter statistics"""
         return {
             'total': self.total_encounters,
             'by_pokemon': dict(self.encounters),
-            'session_duration': str(datetime.now() - self.start_time),
+            'session_duration': str(self._session_end() - self.start_time),
             'start_time': self.start_time.isoformat()
         }
 
@@ -239,14 +575,14 @@ class EncounterCounter:
             writer = csv.writer(f)
             writer.writerow(['Pokemon', 'Count', 'Percentage'])
 
-            for pokemon, count in sorted(self.encounters.items(), key=lambda x: x[1], reverse=True):
+            for pokemon, count in self.stats.ranking():
                 percentage = (count / self.total_encounters * 100) if self.total_encounters > 0 else 0
                 writer.writerow([pokemon, count, f"{percentage:.1f}%"])
 
             writer.writerow([])
             writer.writerow(['Total', self.total_encounters, '100%'])
             writer.writerow(['Session Start', self.start_time.strftime('%Y-%m-%d %H:%M:%S'), ''])
-            writer.writerow(['Session Duration', str(datetime.now() - self.start_time), ''])
+            writer.writerow(['Session Duration', str(self._session_end() - self.start_time), ''])
 
         print(f"Saved {self.total_encounters} encounters to {filename}")
         return filename
@@ -255,14 +591,58 @@ class EncounterCounter:
         """Display current statistics to console"""
         print(f"\n=== ENCOUNTER STATISTICS ===")
         print(f"Total encounters: {self.total_encounters}")
-        print(f"Session duration: {datetime.now() - self.start_time}")
+        print(f"Session duration: {self._session_end() - self.start_time}")
+
+        summary = self.live_summary(top=None)
+        rates = ", ".join(f"{rate:.0f}/h (last {seconds // 60}min)"
+                          for seconds, rate in summary['rates_per_hour'].items())
+        print(f"Encounter rate: {rates}")
+        if summary['mean_time_between'] is not None:
+            print(f"Mean time between encounters: {summary['mean_time_between']:.1f}s")
+            print(f"Expected time to shiny: {timedelta(seconds=round(summary['expected_time_to_shiny']))}")
+
         print("\nBy Pokémon:")
-        for pokemon, count in sorted(self.encounters.items(), key=lambda x: x[1], reverse=True):
+        for pokemon, count in summary['top']:
             percentage = (count / self.total_encounters * 100) if self.total_encounters > 0 else 0
             print(f"  {pokemon}: {count} ({percentage:.1f}%)")
 
 
 
+def report_metrics(save_path, start_time):
+    """Print the stage latencies, also written next to the encounter logs for later graphing"""
+    for line in METRICS.summary_lines():
+        print(f"Latency {line}")
+    metrics_file = os.path.join(save_path, f"metrics_{start_time.strftime('%Y%m%d_%H%M%S')}.prom")
+    print(f"Latency histograms saved to {METRICS.dump(metrics_file)}")
+
+
+def add_profile_arguments(parser):
+    """Command line options of the profiling mode, shared with the launcher"""
+    parser.add_argument('--profile', action='store_true',
+                        help="Periodically save cProfile stats and tracemalloc snapshots of the detection and event loops")
+    parser.add_argument('--profile-interval', type=float, default=300.0, metavar='SECONDS',
+                        help="Seconds between two snapshots (default: 300)")
+    parser.add_argument('--profile-ticks', type=int, default=0, metavar='N',
+                        help="Also snapshot every N detector scans, N seconds for the event loop (default: off)")
+    parser.add_argument('--profile-dir', default='Profiles', help="Folder of the snapshot files")
+
+
+def profiler_from_args(args):
+    if not args.profile:
+        return None
+    return Profiler(args.profile_dir, interval=args.profile_interval, every_ticks=args.profile_ticks)
+
+
 if __name__ == "__main__":
-    sc = ShinyCatcher()
-    sc.main()
+    parser = argparse.ArgumentParser(description="PROAutoBot shiny hunter")
+    parser.add_argument('--config', default="CONFIG.ini", help="Config file")
+    parser.add_argument('--clients', nargs='+', metavar='CONFIG',
+                        help="Hunt in several game windows, one config file (with its window_region) per client")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.clients:
+        MultiClientHunter(args.clients, profiler_from_args(args)).main()
+    else:
+        sc = ShinyCatcher(args.config, profiler_from_args(args))
+        sc.main()
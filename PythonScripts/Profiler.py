@@ -0,0 +1,126 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+
+class Profiler:
+    """
+    Periodic cProfile and tracemalloc snapshots of long running loops.
+
+    Every profiled thread calls tick(name) once per iteration: every `every_ticks` ticks or
+    `interval` seconds, the CPU profile of the period and a memory snapshot are written to
+    timestamped files, so a slow drift over a night shows up by comparing consecutive files.
+    Before Python 3.12 cProfile only follows the thread that enabled it, so each thread gets its own
+    profile and tick() and detach() must be called from that thread. From 3.12 on a single profile
+    sees every thread (and only one can run), the first thread to tick profiles for all of them.
+    """
+
+    # Allocations of the import machinery and of tracemalloc itself, not the bot's
+    IGNORED = (tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+               tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+               tracemalloc.Filter(False, tracemalloc.__file__))
+
+    PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+    def __init__(self, output_dir='Profiles', interval=300.0, every_ticks=0, top=15, frames=5):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.every_ticks = every_ticks  # 0 snapshots on time only
+        self.top = top
+        self.frames = frames  # Traceback depth kept by tracemalloc
+
+        self._periods = {}  # {thread name: [profile, period start, ticks]}
+        self._lock = threading.Lock()
+        self._memory_owner = None  # Thread whose periods also snapshot the memory (it is process wide)
+        self.total_stats = {}  # {thread name, or 'all' from 3.12: CPU stats of every period added together}
+        self.first_snapshot = None
+        self.last_snapshot = None
+        self.snapshots = 0
+
+    def start(self):
+        """Start tracing allocations, before the objects of interest get created"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tracemalloc.start(self.frames)
+        self.first_snapshot = tracemalloc.take_snapshot()
+        return self
+
+    def tick(self, name='detector'):
+        """One iteration of the loop profiled on the calling thread, snapshots when a period is over"""
+        period = self._periods.get(name)
+        if period is None:
+            self._start_period(name)
+            return
+
+        period[2] += 1
+        if (self.every_ticks and period[2] >= self.every_ticks) or \
+                (self.interval and time.time() - period[1] >= self.interval):
+            self._end_period(name)
+            self._start_period(name)
+
+    def detach(self, name='detector'):
+        """Stop profiling the calling thread, keeping its last (partial) period"""
+        if name in self._periods:
+            self._end_period(name)
+
+    def _start_period(self, name):
+        with self._lock:
+            if self.PROFILES_ALL_THREADS and self._periods:
+                return  # This thread is already followed by the running profile
+            if self._memory_owner is None:
+                self._memory_owner = name
+            profile = cProfile.Profile()
+            self._periods[name] = [profile, time.time(), 0]
+            profile.enable()
+
+    def _end_period(self, name):
+        profile = self._periods[name][0]
+        profile.disable()
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        with self._lock:
+            del self._periods[name]
+            self.snapshots += 1
+            number = self.snapshots
+            stats = pstats.Stats(profile)
+            stats.dump_stats(os.path.join(self.output_dir, f"cpu_{name}_{stamp}_{number:03d}.prof"))
+            key = 'all' if self.PROFILES_ALL_THREADS else name  # Whichever thread ran it, the profile covered all
+            if key not in self.total_stats:
+                self.total_stats[key] = stats
+            else:
+                self.total_stats[key].add(stats)
+
+            if name == self._memory_owner and tracemalloc.is_tracing():
+                self.last_snapshot = tracemalloc.take_snapshot()
+                self.last_snapshot.dump(os.path.join(self.output_dir, f"memory_{stamp}_{number:03d}.snapshot"))
+
+    def report(self):
+        """Print the hottest functions of every profiled thread and the top allocators of the whole run"""
+        for name, stats in self.total_stats.items():
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.strip_dirs().sort_stats('tottime').print_stats(self.top)
+            label = "all threads" if name == 'all' else f"{name} thread"
+            print(f"\n=== HOTTEST FUNCTIONS ({label}) ===")
+            print(stream.getvalue().strip())
+
+        if tracemalloc.is_tracing():
+            self.last_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        if self.last_snapshot is not None:
+            self.last_snapshot = self.last_snapshot.filter_traces(self.IGNORED)
+            print("\n=== TOP ALLOCATORS ===")
+            for stat in self.last_snapshot.statistics('lineno')[:self.top]:
+                print(f"  {stat}")
+
+            # Growth since the start is what a leak looks like
+            print("\n=== MEMORY GROWTH SINCE START ===")
+            first_snapshot = self.first_snapshot.filter_traces(self.IGNORED)
+            for stat in self.last_snapshot.compare_to(first_snapshot, 'lineno')[:self.top]:
+                print(f"  {stat}")
+        print(f"\nProfiles saved to {self.output_dir}")
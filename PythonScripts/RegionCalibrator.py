@@ -1,12 +1,14 @@
+import cv2
 import numpy as np
-import pyautogui
 import tkinter as tk
 from PIL import Image, ImageTk
 import ctypes
 import time
+from CaptureBackend import create_backend
 
 class RegionCalibrator:
-    def __init__(self):
+    def __init__(self, capture_backend=None):
+        self.capture_backend = capture_backend if capture_backend is not None else create_backend()
         self.root = None
         self.canvas = None
         self.start_x = None #Anchor point for rectangle drawing
@@ -31,7 +33,8 @@ class RegionCalibrator:
         self.root.configure(bg='black')
 
         # Take screenshot and darken it
-        self.screenshot = pyautogui.screenshot()
+        frame = self.capture_backend.grab()
+        self.screenshot = Image.fromarray(cv2.cvtColor(frame.bgr, cv2.COLOR_BGR2RGB))
         self.darkened_screenshot = self._darken_image(self.screenshot)
 
         # Create canvas
@@ -0,0 +1,100 @@
+import threading
+import time
+
+
+class ScanScheduler:
+    """
+    Chooses how long the detector waits between scans from what the hunter is doing:
+    fast right after a direction switch and while waiting for the action icon,
+    slower while walking steadily and much slower during AFK breaks.
+    The wait never lets detection use more than cpu_budget of a core.
+    """
+    MIN_CPU_BUDGET = 0.01  # A budget of 0 would never let a scan run
+
+    def __init__(self, scan_interval=0.1, cpu_budget=0.5, boost_duration=1.0, settle_time=5.0):
+        self.intervals = {
+            'fast': scan_interval / 2,
+            'normal': scan_interval,
+            'slow': scan_interval * 3,
+            'idle': max(1.0, scan_interval * 10)
+        }
+        self.cpu_budget = min(max(cpu_budget, self.MIN_CPU_BUDGET), 1.0)  # Fraction of the time detection may spend working
+        if self.cpu_budget != cpu_budget:
+            print(f"cpu_budget must be in (0, 1], got {cpu_budget}, using {self.cpu_budget}")
+        self.boost_duration = boost_duration
+        self.settle_time = settle_time  # Time without events before backing off
+
+        self._lock = threading.Lock()
+        self.idle = False
+        self.in_battle = False
+        self.waiting_action = False
+        self.boost_until = 0.0
+        self.last_event_time = time.time()
+
+        # Stats
+        self.start_time = time.time()
+        self.ticks = 0
+        self.work_time = 0.0
+        self.last_tick_time = None
+        self.transitions = 0
+        self.latency_total = 0.0
+
+    def boost(self, duration=None):
+        """Poll fast for a while, something is likely to happen (direction switch, battle start)"""
+        with self._lock:
+            self.boost_until = time.time() + (duration if duration is not None else self.boost_duration)
+            self.last_event_time = time.time()
+
+    def set_idle(self, idle):
+        """Nothing can happen while the player is AFK"""
+        with self._lock:
+            self.idle = idle
+            self.last_event_time = time.time()
+
+    def set_battle_state(self, in_battle, action_ready):
+        with self._lock:
+            self.in_battle = in_battle
+            self.waiting_action = in_battle and not action_ready
+
+    def mode(self, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            if self.idle:
+                return 'idle'
+            if self.waiting_action or now < self.boost_until:
+                return 'fast'
+            if self.in_battle or now - self.last_event_time < self.settle_time:
+                return 'normal'
+            return 'slow'
+
+    def record_transition(self, capture_time):
+        """
+        A state change was seen on the frame captured at capture_time.
+        It happened at some point since the previous scan, so half the gap is the expected delay.
+        """
+        with self._lock:
+            self.transitions += 1
+            self.last_event_time = time.time()
+            gap = capture_time - self.last_tick_time if self.last_tick_time else 0.0
+            self.latency_total += gap / 2 + (time.time() - capture_time)
+
+    def next_delay(self, tick_start, work_time):
+        """Seconds to wait before the next scan, given when this one started and how long it took"""
+        self.ticks += 1
+        self.work_time += work_time
+        self.last_tick_time = tick_start
+
+        period = self.intervals[self.mode()]
+        budget_delay = work_time * (1 - self.cpu_budget) / self.cpu_budget
+        return max(period - work_time, budget_delay, 0.0)
+
+    def stats(self):
+        elapsed = time.time() - self.start_time
+        return {
+            'ticks': self.ticks,
+            'tick_rate': self.ticks / elapsed if elapsed > 0 else 0.0,
+            'mean_work_time': self.work_time / self.ticks if self.ticks else 0.0,
+            'cpu_share': self.work_time / elapsed if elapsed > 0 else 0.0,
+            'transitions': self.transitions,
+            'mean_reaction_latency': self.latency_total / self.transitions if self.transitions else 0.0
+        }
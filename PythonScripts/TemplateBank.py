@@ -0,0 +1,96 @@
+import json
+import os
+import time
+
+import cv2
+
+
+# UI scales covered by the bank, from a small window up to 200% display scaling
+DEFAULT_SCALES = (1.0, 0.75, 0.8, 0.9, 1.1, 1.25, 1.5, 1.75, 2.0)
+
+
+class TemplateBank:
+    """
+    Every template pre-scaled once at start up to the usual UI scales.
+    The game is drawn at a single scale, so the first battle template match fixes the scale of
+    all of them for the session and the scale is saved for the next one. Until then every
+    search tries a single candidate scale: a saved scale alone for the first `trust_saved`
+    seconds (long enough for a few encounters, misses while walking say nothing about the scale),
+    then one tick out of two the expected scale (saved or 1.0) while the others cycle through
+    the rest of the bank.
+    """
+
+    def __init__(self, cache_path=None, scales=DEFAULT_SCALES, trust_saved=300.0):
+        self.cache_path = cache_path
+        self.preferred = 1.0  # Scale expected before anything matched
+        self.scale = None  # Scale confirmed by a match this session
+
+        saved = self._load()
+        self.trusted_until = 0.0  # Only the saved scale is searched until then
+        if saved is not None:
+            self.preferred = saved
+            self.trusted_until = time.time() + trust_saved
+        self.scales = (self.preferred,) + tuple(s for s in scales if s != self.preferred)
+
+        self.templates = {}  # {name: {scale: template}}
+        self._tries = {}  # {name: searches made while the scale is unconfirmed}
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return float(json.load(f)['scale'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring the saved template scale: {e}")
+            return None
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'scale': self.scale}, f)
+        except OSError as e:
+            print(f"Could not save the template scale: {e}")
+
+    @staticmethod
+    def _resize(template, scale):
+        if scale == 1.0:
+            return template
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        return cv2.resize(template, None, fx=scale, fy=scale, interpolation=interpolation)
+
+    def add(self, name, template):
+        """Register a template and build its scaled versions"""
+        self.templates[name] = {scale: self._resize(template, scale) for scale in self.scales}
+        return self.get(name)
+
+    def get(self, name, scale=None):
+        """Template at the given scale, by default the confirmed (or else the expected) one"""
+        return self.templates[name][scale or self.scale or self.preferred]
+
+    @property
+    def confirmed(self):
+        return self.scale is not None
+
+    def next_candidate(self, name):
+        """Scale to search this template at next while the session scale is unknown"""
+        if time.time() < self.trusted_until:
+            return self.preferred
+        tries = self._tries.get(name, 0)
+        self._tries[name] = tries + 1
+        if tries % 2 == 0 or len(self.scales) == 1:
+            return self.preferred
+        others = self.scales[1:]
+        return others[(tries // 2) % len(others)]
+
+    def confirm(self, scale):
+        """The battle template matched at this scale, use it for every template from now on"""
+        self.scale = scale
+        if scale != self.preferred:
+            print(f"Templates matched at {scale:.0%} scale")
+            self.preferred = scale
+            self._save()
+        elif self.cache_path and not os.path.exists(self.cache_path):
+            self._save()
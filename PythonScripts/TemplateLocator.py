@@ -0,0 +1,166 @@
+import cv2
+import numpy as np
+
+from ChangeGate import ChangeGate
+from Metrics import METRICS
+
+
+class TemplateLocator:
+    """
+    Finds a template with a full screen search once, then only searches a small
+    padded window around the place it last matched (UI elements don't move during a session)
+    Only window searches go through the change gate: a mean difference over the whole screen
+    stays under the gate threshold when a small element appears, so full searches always match.
+    """
+
+    CANDIDATES = 5  # Coarse peaks confirmed at full resolution by a pyramid search
+    MIN_COARSE_SIZE = 8  # Smallest downsampled template side worth matching
+
+    def __init__(self, template, padding=24, max_misses=8, max_miss_time=1.0, gate=None, name='template',
+                 pyramid_levels=2, gated=True):
+        self.template = template
+        self.pyramid_levels = pyramid_levels  # Halvings of a full search's coarse pass, 0 searches at full resolution only
+        self._coarse_template = self._downsample(template, pyramid_levels)
+        self.stage = f"match_{name}"  # Latency histogram of the matchTemplate calls
+        # Skips window searches when the window didn't change, None always matches
+        self.gate = (gate if gate is not None else ChangeGate()) if gated else None
+        self._last_result = (0.0, None)
+        self.padding = padding
+        self.max_misses = max_misses  # Consecutive window misses before trying a full search again
+        # Seconds of window misses before a full search, whatever the scan rate: the game window may have moved
+        self.max_miss_time = max_miss_time
+
+        self.location = None  # Top left corner of the last match, in screen coordinates
+        self.misses = 0
+        self.miss_start = 0.0  # Timestamp of the first miss of the current streak
+        self.full_searches = 0
+        self.window_searches = 0
+
+    @property
+    def size(self):
+        """Template (width, height)"""
+        return self.template.shape[1], self.template.shape[0]
+
+    def _view(self, frame):
+        """Pick the frame view that matches the template channels"""
+        return frame.gray if self.template.ndim == 2 else frame.bgr
+
+    def _search_window(self):
+        """Screen region (x, y, width, height) around the learned location"""
+        x, y = self.location
+        w, h = self.size
+        return (x - self.padding, y - self.padding, w + 2 * self.padding, h + 2 * self.padding)
+
+    @classmethod
+    def _downsample(cls, template, levels):
+        """Template at the coarse pyramid level, None when too small to be matched there"""
+        for _ in range(levels):
+            template = cv2.pyrDown(template)
+        if levels <= 0 or min(template.shape[:2]) < cls.MIN_COARSE_SIZE:
+            return None
+        return template
+
+    def _match_pyramid(self, frame):
+        """
+        Full search in two passes: the downsampled template is matched over the downsampled frame,
+        then the best coarse peaks are matched again at full resolution in small windows.
+        The score is the full resolution TM_CCOEFF_NORMED score, like _match.
+        """
+        image = self._view(frame)
+        w, h = self.size
+        coarse = image
+        for _ in range(self.pyramid_levels):
+            coarse = cv2.pyrDown(coarse)
+        ch, cw = self._coarse_template.shape[:2]
+        if coarse.shape[0] < ch or coarse.shape[1] < cw:
+            return self._match(frame)
+
+        with METRICS.timer(self.stage):
+            res = cv2.matchTemplate(coarse, self._coarse_template, cv2.TM_CCOEFF_NORMED)
+            factor = 2 ** self.pyramid_levels
+            radius = factor + 2  # Coarse position error, in full resolution pixels
+
+            best = (-1.0, None)
+            for _ in range(self.CANDIDATES):
+                _, _, _, (cx, cy) = cv2.minMaxLoc(res)
+
+                # Confirm around the peak at full resolution
+                x0 = max(0, cx * factor - radius)
+                y0 = max(0, cy * factor - radius)
+                window = image[y0:min(image.shape[0], cy * factor + radius + h),
+                               x0:min(image.shape[1], cx * factor + radius + w)]
+                if window.shape[0] >= h and window.shape[1] >= w:
+                    _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED))
+                    if score > best[0]:
+                        best = (score, (frame.origin[0] + x0 + x, frame.origin[1] + y0 + y))
+
+                # Suppress that peak so the next one is another place
+                res[max(0, cy - ch // 2):cy + ch // 2 + 1, max(0, cx - cw // 2):cx + cw // 2 + 1] = -np.inf
+
+        return best if best[1] is not None else (0.0, None)
+
+    def _match(self, frame, gated=False):
+        """Run matchTemplate over a frame, returns (best score, top left screen coordinates)"""
+        image = self._view(frame)
+        w, h = self.size
+        if image.shape[0] < h or image.shape[1] < w:
+            return 0.0, None
+
+        # Same pixels as the last window match, same verdict
+        if gated and self.gate is not None and not self.gate.changed(frame.region, image):
+            return self._last_result
+
+        with METRICS.timer(self.stage):
+            res = cv2.matchTemplate(image, self.template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        result = (max_val, (frame.origin[0] + max_loc[0], frame.origin[1] + max_loc[1]))
+        if gated:
+            self._last_result = result
+        return result
+
+    @property
+    def skipped_matches(self):
+        """matchTemplate calls avoided because the searched region didn't change"""
+        return self.gate.skips if self.gate is not None else 0
+
+    def set_template(self, template):
+        """Swap the template (e.g. for another scale), what was learned with the old one doesn't hold anymore"""
+        if template is self.template:
+            return
+        self.template = template
+        self._coarse_template = self._downsample(template, self.pyramid_levels)
+        if self.gate is not None:
+            self.gate.reset()
+        self._last_result = (0.0, None)
+        self.forget()
+
+    def forget(self):
+        """Drop the learned location so the next search covers the whole frame"""
+        self.location = None
+        self.misses = 0
+
+    def locate(self, frame, threshold=0.8):
+        """
+        Best match score and location for the template in the frame
+        Returns: (score, (x, y)) where the location is None if nothing could be matched
+        """
+        if self.location is not None and self.misses < self.max_misses and \
+                (self.misses == 0 or frame.timestamp - self.miss_start < self.max_miss_time):
+            self.window_searches += 1
+            score, loc = self._match(frame.crop(self._search_window()), gated=True)
+            if score >= threshold:
+                self.misses = 0
+                self.location = loc
+                return score, loc
+            if self.misses == 0:
+                self.miss_start = frame.timestamp
+            self.misses += 1
+            return score, loc
+
+        self.full_searches += 1
+        score, loc = self._match_pyramid(frame) if self._coarse_template is not None else self._match(frame)
+        if score >= threshold:
+            self.location = loc
+        # A miss here usually means the element just isn't on screen, keep the old spot
+        self.misses = 0
+        return score, loc